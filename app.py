@@ -1,70 +1,259 @@
 #this is imports and config: this pulls in flask and our custom modules while loading environment variables, and it uses python's os and dotenv libraries alongside pypdf2, and this is why we do it like this to keep api keys secure and allow server-side document parsing
-from flask import Flask, render_template, request, jsonify
+from flask import Flask, render_template, request, jsonify, Response, stream_with_context, g
 from dotenv import load_dotenv
 import os
-import pandas as pd
-import PyPDF2 
+import hmac
+import json
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# edge case: .env must be loaded before the backend imports, because the data manager and http client read their settings at import time
+load_dotenv()
+os.environ['KMP_DUPLICATE_LIB_OK'] = 'True'
 
 from backend.data_loader import data_manager
-from backend.rag_engine import RagEngine
 from backend.report_gen import ReportGenerator
+from backend.jobs import JobManager
+from backend import metrics
 
-load_dotenv()
-os.environ['KMP_DUPLICATE_LIB_OK'] = 'True'
 app = Flask(__name__)
+# edge case: flask rejects bodies over this size with a 413 before the upload is ever buffered
+app.config['MAX_CONTENT_LENGTH'] = int(os.environ.get('upload_max_bytes', 20 * 1024 * 1024))
+
+job_manager = JobManager(
+    max_workers=int(os.environ.get('upload_workers', 2)),
+    analysis_workers=int(os.environ.get('upload_analysis_workers', 2)),
+    max_pages=int(os.environ.get('upload_max_pages', 300)),
+    time_limit=float(os.environ.get('upload_time_limit', 60)),
+    ttl=int(os.environ.get('job_ttl', 3600))
+)
+
+# edge case: the ai engine starts as None and is filled in by the startup thread; ai_status tells "still warming" apart from "offline"
+rag_engine = None
+ai_status = {"state": 'waiting', "error": None}
+ai_ready = threading.Event()
+report_gen = ReportGenerator(data_manager, None)
+
+# edge case: set policies_watch_interval=0 to only reload through the admin endpoint
+watch_interval = float(os.environ.get('policies_watch_interval', 30))
+# edge case: data endpoints hold a request this many seconds for the csv before answering 503
+policies_wait = float(os.environ.get('policies_load_wait', 10))
+
+# edge case: one resync thread applies reloads in order, and each run syncs to the newest store so a slow re-embed can't publish an older csv over a newer one
+resync_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix='rag-resync')
+
+def resync_vectors(engine):
+    try:
+        engine.update_store(data_manager.store)
+    except Exception as e:
+        print(f"vector index resync error: {e}")
+
+def set_ai_state(state, error=None):
+    ai_status.update(state=state, error=error)
+    if state not in ('waiting', 'warming'):
+        ai_ready.set()
+
+#this is staged startup: this loads the csv, starts the file watch, and only then imports and builds the rag engine, all on one background thread, and this is why we do it like this so flask binds its port immediately, the graph and filters are served as soon as the csv is in, and the slow langchain import and vector build never hold up health checks
+def start_up():
+    global rag_engine
+    with metrics.timed('startup', phase='policies'):
+        data_manager.load_data()
+    if watch_interval > 0:
+        data_manager.start_file_watch(watch_interval)
 
-#this is ai initialization: this creates the rag engine and report generator instances, and it passes the data manager directly to them, and this is why we do it like this so the ai has immediate access to the policies on server startup
-# edge case: checking if dataframe is empty to prevent fatal crash if csv is missing
-if not data_manager.policies_df.empty:
-    rag_engine = RagEngine(data_manager.policies_df, data_manager.tag_columns)
-else:
-    print("warning: policies dataframe is empty. ai will not work.")
-    rag_engine = None
+    # edge case: checking if the store is empty to keep the ai offline rather than building an index with no documents
+    if not len(data_manager.store):
+        print("warning: policies dataframe is empty. ai will not work.")
+        set_ai_state('offline')
+        return
+
+    set_ai_state('warming')
+    try:
+        with metrics.timed('startup', phase='ai'):
+            # edge case: langchain, openai and faiss are imported here, on first use, rather than when app.py is imported
+            from backend.rag_engine import RagEngine
+            built_from = data_manager.store
+            engine = RagEngine(built_from)
+    except Exception as e:
+        print(f"ai engine failed to start: {e}")
+        set_ai_state('error', str(e))
+        return
+
+    # edge case: reloads re-sync the vector index so the ai sees csv edits without a restart; the re-embed runs on its own thread so a reload returns as soon as the data snapshot is published
+    data_manager.on_reload(lambda store, diff: resync_pool.submit(resync_vectors, engine))
+    # edge case: a reload that landed while the engine was building would otherwise be missed
+    if data_manager.store is not built_from:
+        engine.update_store(data_manager.store)
+    report_gen.rag_engine = engine
+    rag_engine = engine
+    set_ai_state('ready')
+
+# edge case: warm-up can be disabled with telemetry_warmup_interval=0, e.g. for offline development
+warmup_interval = int(os.environ.get('telemetry_warmup_interval', 6 * 3600))
+started_pid = None
+start_lock = threading.Lock()
+
+#this is per-process startup: this starts the startup and warm-up threads once in each process, on its first request, and this is why we do it like this because threads don't survive a fork, so a server that imports the app and then forks its workers (gunicorn --preload) would otherwise leave every worker warming forever
+def start_background():
+    global started_pid
+    with start_lock:
+        if started_pid == os.getpid():
+            return
+        started_pid = os.getpid()
+    threading.Thread(target=start_up, name='startup', daemon=True).start()
+    if warmup_interval > 0:
+        data_manager.start_warmup(warmup_interval)
+
+app.before_request(start_background)
+
+#this is request timing: this times every request by endpoint and status and, when server_timing is on, lists the stages it spent time in as a server-timing header, and this is why we do it like this so a slow page can be traced to csv, retrieval, llm or upstream time straight from the browser's network tab
+# edge case: server-timing is off by default because it reveals internal stage names to every client
+server_timing = str(os.environ.get('server_timing', '')).lower() in ('1', 'true', 'yes')
+
+@app.before_request
+def start_timer():
+    g.started = time.perf_counter()
+    metrics.begin_request()
+
+@app.after_request
+def record_timing(response):
+    elapsed = time.perf_counter() - g.started
+    metrics.observe('symbiosis_http_request_seconds', elapsed, endpoint=request.endpoint or 'unknown', status=response.status_code)
+    timings = metrics.request_timings()
+    if server_timing:
+        # edge case: for streamed responses this only covers the work done before the first byte
+        entries = [f"{stage.replace('_', '-')};dur={seconds * 1000:.1f}" for stage, seconds in timings]
+        response.headers['Server-Timing'] = ", ".join(entries + [f"total;dur={elapsed * 1000:.1f}"])
+    return response
+
+#this is streaming helper: this wraps an event generator as newline-delimited json and turns a mid-stream failure into a final error event, and this is why we do it like this so every streaming endpoint speaks the same format to chat.js and main.js
+def stream_events(events):
+    def generate():
+        try:
+            for event in events:
+                yield json.dumps(event) + "\n"
+        except Exception as e:
+            yield json.dumps({"error": str(e)}) + "\n"
+        yield json.dumps({"done": True}) + "\n"
+    
+    # edge case: disable proxy buffering so tokens reach the browser as they're produced
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson', headers={"X-Accel-Buffering": "no"})
 
-report_gen = ReportGenerator(data_manager, rag_engine)
+#this is startup guards: this builds the 503 replies for requests that arrive before the csv or the ai engine is ready, and this is why we do it like this so clients get a clear retry-after instead of an empty graph or an "offline" answer during a deploy
+def not_ready(payload, state):
+    response = jsonify(dict(payload, status=state))
+    response.status_code = 503
+    response.headers['Retry-After'] = '5'
+    return response
+
+def policies_loading():
+    return not_ready({"error": "policies are still loading. try again in a moment."}, data_manager.status)
+
+def ai_warming():
+    return ai_status["state"] in ('waiting', 'warming')
+
+def wants_stream(payload=None):
+    flag = request.args.get('stream') or (payload or {}).get('stream') or request.form.get('stream')
+    return str(flag).lower() in ('1', 'true', 'yes')
+
+#this is upload size errors: this answers flask's body-size rejection with json instead of its html error page, and this is why we do it like this so main.js can show the size limit rather than a generic connection error
+@app.errorhandler(413)
+def upload_too_large(e):
+    return jsonify({"error": "file exceeds upload_max_bytes"}), 413
 
 #this is route definitions: this maps web urls to python functions, and it returns json data or html templates based on the route, and this is why we do it like this so the frontend can easily fetch dynamic data asynchronously
 @app.route('/')
 def index():
     return render_template('index.html')
 
+#this is health endpoints: this reports liveness unconditionally and readiness once the csv is loaded (or, with ?require=ai, once the ai engine is up too), and this is why we do it like this so load balancers can route traffic to the non-ai surface within a second of boot while rollouts can still wait for the full app
+@app.route('/healthz')
+def healthz():
+    return jsonify({"status": "ok"})
+
+@app.route('/readyz')
+def readyz():
+    ready = data_manager.status == 'ready'
+    if request.args.get('require') == 'ai':
+        ready = ready and ai_status["state"] == 'ready'
+    body = {"ready": ready, "policies": data_manager.status, "ai": ai_status["state"]}
+    if data_manager.load_error or ai_status["error"]:
+        body["error"] = data_manager.load_error or ai_status["error"]
+    return jsonify(body), 200 if ready else 503
+
+@app.route('/metrics')
+def prometheus_metrics():
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
 @app.route('/api/graph')
 def api_graph():
-    return jsonify(data_manager.get_graph_data(
+    if not data_manager.wait_until_loaded(policies_wait):
+        return policies_loading()
+    body, etag = data_manager.get_graph_response(
         request.args.get('search', ''),
         request.args.get('category', ''),
-        request.args.get('type', '')
+        request.args.get('type', ''),
+        request.args.get('min_shared', type=int),
+        request.args.get('max_neighbors', type=int)
+    )
+    # edge case: no-cache makes the browser revalidate every time, so an unchanged graph costs a 304 instead of a re-download
+    response = Response(body, mimetype='application/json', headers={"Cache-Control": "no-cache"})
+    response.set_etag(etag)
+    return response.make_conditional(request)
+
+@app.route('/api/suggest')
+def api_suggest():
+    if not data_manager.wait_until_loaded(policies_wait):
+        return policies_loading()
+    return jsonify(data_manager.search_index.suggest(
+        request.args.get('q', ''),
+        request.args.get('limit', 10, type=int)
     ))
 
-@app.route('/api/telemetry')
+@app.route('/api/telemetry', methods=['GET', 'POST'])
 def api_telemetry():
+    if not data_manager.wait_until_loaded(policies_wait):
+        return policies_loading()
+    # edge case: batch callers send {"countries": [...]} or repeat ?country=, and get a payload keyed by country back
+    if request.method == 'POST':
+        countries = (request.get_json(silent=True) or {}).get('countries')
+        # edge case: a bare string would be iterated letter by letter and nested lists can't be keys, so anything but a list of names is rejected
+        if not isinstance(countries, list) or not all(isinstance(c, str) for c in countries):
+            return jsonify({"error": "countries must be a list of country names"}), 400
+        return jsonify(data_manager.get_telemetry_bulk(countries))
+    
+    countries = request.args.getlist('country')
+    if len(countries) > 1:
+        return jsonify(data_manager.get_telemetry_bulk(countries))
     return jsonify(data_manager.get_telemetry(request.args.get('country')))
 
 @app.route('/api/countries')
 def api_countries():
-    # edge case: return empty list safely if metrics data failed to load entirely
-    if data_manager.metrics_df.empty:
-        return jsonify([])
-    countries = sorted([str(c) for c in data_manager.metrics_df['country'].unique() if pd.notnull(c)])
-    return jsonify(countries)
+    # edge case: telemetry comes from the live apis, so the supported countries are exactly the iso map keys
+    return jsonify(sorted(data_manager.iso_map))
 
 @app.route('/api/filters')
 def get_filters():
-    # edge case: handle empty policy database so dropdowns show empty instead of throwing a 500 error
-    if data_manager.policies_df.empty:
-        return jsonify({"categories": [], "types": []})
-        
-    cats = sorted([str(c) for c in data_manager.policies_df['category'].unique() if pd.notnull(c)])
-    types = sorted([str(t) for t in data_manager.policies_df['type'].unique() if pd.notnull(t)])
-    return jsonify({"categories": cats, "types": types})
+    if not data_manager.wait_until_loaded(policies_wait):
+        return policies_loading()
+    # edge case: an empty policy store has empty indexes, so dropdowns show empty instead of throwing a 500 error
+    return jsonify({
+        "categories": data_manager.store.values('category'),
+        "types": data_manager.store.values('type')
+    })
 
 @app.route('/api/ask', methods=['POST'])
 def api_ask():
     # edge case: safely return an error message if rag engine failed to initialize earlier
     if not rag_engine:
+        if ai_warming():
+            return not_ready({"answer": "the ai engine is still warming up. try again in a moment.", "sources": []}, ai_status["state"])
         return jsonify({"answer": "system is offline (no data).", "sources": []})
         
     query = request.json.get('query')
+    if wants_stream(request.json):
+        return stream_events(rag_engine.ask_stream(query))
     answer, sources = rag_engine.ask(query)
     return jsonify({"answer": answer, "sources": sources})
 
@@ -74,11 +263,35 @@ def api_report():
     # edge case: catch missing country payload before trying to run the generator
     if not country:
         return jsonify({"error": "no country selected"}), 400
+    if ai_warming():
+        return not_ready({"error": "the ai engine is still warming up. try again in a moment."}, ai_status["state"])
     
+    if wants_stream(request.json):
+        return stream_events(report_gen.generate_brief_stream(country))
     report_data = report_gen.generate_brief(country)
     return jsonify(report_data)
 
-#this is pdf upload endpoint: this receives a multipart form data file from the frontend and extracts text page by page in memory, and it passes it to the rag engine, and this is why we do it like this to avoid saving user files locally which avoids disk bloat and security risks
+#this is corpus reload endpoint: this re-reads data/policies.csv and publishes only the changed rows, guarded by the admin_token env var, and answers 202 while the ai's vector index re-syncs in the background, and this is why we do it like this so analysts can publish corpus updates without restarting the server and a large re-embed can't outlast the worker timeout
+@app.route('/api/admin/reload', methods=['POST'])
+def api_admin_reload():
+    token = os.environ.get('admin_token')
+    # edge case: the endpoint stays disabled until an admin token is configured, and the token is compared in constant time so response timing doesn't leak it
+    if not token or not hmac.compare_digest(request.headers.get('X-Admin-Token', '').encode(), token.encode()):
+        return jsonify({"error": "forbidden"}), 403
+    # edge case: a reload before the first load finishes would diff against the empty placeholder store
+    if not data_manager.wait_until_loaded(policies_wait):
+        return policies_loading()
+    try:
+        diff = data_manager.reload()
+    except FileNotFoundError as e:
+        return jsonify({"error": str(e)}), 409
+    counts = {k: len(v) for k, v in diff.items()}
+    # edge case: an unchanged csv has nothing to re-embed, so it is answered as complete
+    if not any(counts.values()):
+        return jsonify(counts)
+    return jsonify(dict(counts, ai=('resyncing' if rag_engine else ai_status["state"]))), 202
+
+#this is pdf upload endpoint: this receives a multipart form data file from the frontend and hands it to a background job that extracts text page by page in a worker process, and it returns a job id right away, and this is why we do it like this to avoid saving user files locally and to keep big uploads from pinning a web worker
 @app.route('/api/upload_policy', methods=['POST'])
 def api_upload_policy():
     # edge case: check if the request actually contains a file object
@@ -91,30 +304,58 @@ def api_upload_policy():
     if file.filename == '':
         return jsonify({"error": "no file selected"}), 400
         
-    if file and file.filename.lower().endswith('.pdf'):
-        try:
-            reader = PyPDF2.PdfReader(file)
-            pdf_text = ""
-            for page in reader.pages:
-                text = page.extract_text()
-                if text:
-                    pdf_text += text + "\n"
-            
-            # edge case: gracefully fail if the pdf was just images and contained no actual text
-            if not pdf_text.strip():
-                return jsonify({"error": "could not extract readable text from this pdf. it may be a scanned image."}), 400
-            
-            if rag_engine:
-                analysis, sources = rag_engine.analyze_pdf(pdf_text)
-                return jsonify({"answer": analysis, "sources": sources})
-            else:
-                return jsonify({"error": "ai engine offline"}), 500
-                
-        except Exception as e:
-            return jsonify({"error": str(e)}), 500
-            
     # edge case: strictly enforce pdf only to avoid parsing garbage data
-    return jsonify({"error": "invalid file type. please upload a .pdf file."}), 400
+    if not file.filename.lower().endswith('.pdf'):
+        return jsonify({"error": "invalid file type. please upload a .pdf file."}), 400
+    
+    if not rag_engine:
+        if ai_warming():
+            return not_ready({"error": "the ai engine is still warming up. try again in a moment."}, ai_status["state"])
+        return jsonify({"error": "ai engine offline"}), 500
+    
+    # edge case: streaming clients only need the text extracted here; the analysis runs inside their stream request
+    if wants_stream():
+        job_id = job_manager.submit(file.read())
+        return jsonify({"job_id": job_id, "status": "queued", "stream_url": f"/api/jobs/{job_id}/stream"}), 202
+    
+    job_id = job_manager.submit(file.read(), rag_engine.analyze_pdf)
+    return jsonify({"job_id": job_id, "status": "queued", "status_url": f"/api/jobs/{job_id}"}), 202
+
+#this is job polling endpoint: this reports an upload job's status and, once finished, its answer and sources, and this is why we do it like this so clients can wait for long documents without holding a connection open
+@app.route('/api/jobs/<job_id>')
+def api_job_status(job_id):
+    job = job_manager.status(job_id)
+    if job is None:
+        return jsonify({"error": "unknown job id"}), 404
+    return jsonify(job)
+
+#this is job streaming endpoint: this waits for the job's extraction to finish and then streams the analysis tokens, and this is why we do it like this so the analyzer tab still renders incrementally with extraction off the request path
+@app.route('/api/jobs/<job_id>/stream')
+def api_job_stream(job_id):
+    job = job_manager.status(job_id)
+    if job is None:
+        return jsonify({"error": "unknown job id"}), 404
+    
+    # edge case: a job analyzed server-side streams its finished result instead of running the analysis again
+    if job['mode'] == 'analyze':
+        if job['status'] != 'done':
+            return jsonify({"error": "this job is analyzed in the background; poll its status instead", "status": job['status'], "status_url": f"/api/jobs/{job_id}"}), 409
+        return stream_events(iter([{"sources": job['sources']}, {"token": job['answer']}]))
+    
+    # edge case: a streamed job's text is handed out once, so a replayed request can't rerun the whole analysis
+    if job['status'] == 'streamed':
+        return jsonify({"error": "this job has already been streamed"}), 409
+    
+    def events():
+        yield {"status": "extracting"}
+        pdf_text = job_manager.wait_for_text(job_id)
+        yield {"status": "analyzing"}
+        yield from rag_engine.analyze_pdf_stream(pdf_text)
+    
+    return stream_events(events())
 
 if __name__ == '__main__':
+    # edge case: the debug reloader runs the app in a child process marked by WERKZEUG_RUN_MAIN, so only that process starts loading before its first request
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        start_background()
     app.run(debug=True, port=5000)
\ No newline at end of file
@@ -0,0 +1,288 @@
+#this is imports and class setup: this imports threading and ordered dicts for a small lru cache, and it sets up the ttl cache class, and this is why we do it like this so slow upstream apis are hit once per ttl window instead of on every page view
+import os
+import json
+import time
+import atexit
+import threading
+from collections import OrderedDict
+import numpy as np
+from backend import metrics
+
+class TTLCache:
+    def __init__(self, max_size=256, path=None, name='cache', save_delay=5.0, max_bytes=None, size_fn=None):
+        self.max_size = max_size
+        # edge case: caches of large values (serialized graph bodies) can also be bounded by their total size, measured with size_fn
+        self.max_bytes = max_bytes if size_fn else None
+        self.size_fn = size_fn
+        self.sizes = {}
+        self.total_bytes = 0
+        self.path = path
+        self.name = name
+        self.save_delay = save_delay
+        self.save_timer = None
+        self.dirty = False
+        self.entries = OrderedDict()
+        self.refreshing = set()
+        self.inflight = {}
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.stale_hits = 0
+        self._load()
+        # edge case: a write still waiting on the save timer is flushed when the process exits normally
+        if self.path:
+            atexit.register(self.flush)
+
+    #this is disk loading: this restores cached entries from a json file on startup and drops anything past its stale window, and this is why we do it like this so a restarted server answers from a warm cache instead of re-downloading everything
+    def _load(self):
+        if not self.path:
+            return
+        try:
+            with open(self.path) as f:
+                saved = json.load(f)
+        except FileNotFoundError:
+            return
+        except (ValueError, OSError) as e:
+            print(f"cache file unreadable, starting cold: {e}")
+            return
+        # edge case: valid json of the wrong shape (a list, or entries that aren't [value, expires_at, stale_until]) is treated like a corrupt file
+        try:
+            now = time.time()
+            entries = OrderedDict()
+            for key, (value, expires_at, stale_until) in saved.items():
+                if float(stale_until) > now:
+                    entries[key] = (value, float(expires_at), float(stale_until))
+        except (AttributeError, TypeError, ValueError) as e:
+            print(f"cache file malformed, starting cold: {e}")
+            return
+        self.entries = entries
+        for key, entry in entries.items():
+            self._track(key, entry[0])
+        self._evict()
+
+    #this is disk saving: this snapshots the entries to a temp file and renames it into place, and this is why we do it like this so a crash mid-write never leaves a corrupt cache file behind
+    def _save(self):
+        if not self.path:
+            return
+        with self.lock:
+            snapshot = {key: list(entry) for key, entry in self.entries.items()}
+        try:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            tmp_path = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump(snapshot, f)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"cache save error: {e}")
+
+    #this is write batching: this marks the cache dirty and starts one save timer if none is pending, and this is why we do it like this so a burst of sets (a prefetch warm-up, a page of charts) costs one file rewrite instead of one per key, and request threads never wait on the disk
+    def _schedule_save(self):
+        if not self.path:
+            return
+        with self.lock:
+            self.dirty = True
+            if self.save_timer is not None:
+                return
+            self.save_timer = threading.Timer(self.save_delay, self.flush)
+            self.save_timer.daemon = True
+            self.save_timer.start()
+
+    def flush(self):
+        with self.lock:
+            if self.save_timer is not None:
+                self.save_timer.cancel()
+                self.save_timer = None
+            if not self.dirty:
+                return
+            self.dirty = False
+        self._save()
+
+    def _track(self, key, value):
+        if not self.max_bytes:
+            return
+        self.total_bytes -= self.sizes.pop(key, 0)
+        if value is not None:
+            self.sizes[key] = self.size_fn(value)
+            self.total_bytes += self.sizes[key]
+
+    def _evict(self):
+        while len(self.entries) > self.max_size or (self.max_bytes and self.total_bytes > self.max_bytes):
+            key, _ = self.entries.popitem(last=False)
+            self._track(key, None)
+
+    #this is raw lookup: this returns the cached value with a freshness label and bumps it to most-recently-used, and this is why we do it like this so callers can tell a fresh hit from a stale one worth revalidating
+    def get(self, key):
+        now = time.time()
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None, 'missing'
+            value, expires_at, stale_until = entry
+            self.entries.move_to_end(key)
+        if now < expires_at:
+            return value, 'fresh'
+        if now < stale_until:
+            return value, 'stale'
+        return value, 'expired'
+
+    #this is fresh-only lookup: this returns a value only while it is inside its ttl, and this is why we do it like this so batch callers can skip keys that are already warm
+    def peek(self, key):
+        value, state = self.get(key)
+        return value if state == 'fresh' else None
+
+    def set(self, key, value, ttl, stale_ttl=0):
+        now = time.time()
+        # edge case: a value bigger than the whole byte budget is returned to the caller but never stored, so it can't flush every other entry
+        if self.max_bytes and self.size_fn(value) > self.max_bytes:
+            return
+        with self.lock:
+            self.entries[key] = (value, now + ttl, now + ttl + stale_ttl)
+            self._track(key, value)
+            self.entries.move_to_end(key)
+            self._evict()
+        self._schedule_save()
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.sizes.clear()
+            self.total_bytes = 0
+        self._schedule_save()
+
+    #this is background revalidation: this refreshes one key on a daemon thread unless a refresh for it is already running, and this is why we do it like this so the user who hit the stale entry isn't the one who waits for the upstream
+    def _refresh(self, key, fetch_fn, ttl, stale_ttl):
+        with self.lock:
+            if key in self.refreshing:
+                return
+            self.refreshing.add(key)
+
+        def run():
+            try:
+                value = fetch_fn()
+                # edge case: a failed refresh keeps serving the stale value rather than caching the failure
+                if value is not None:
+                    self.set(key, value, ttl, stale_ttl)
+            finally:
+                with self.lock:
+                    self.refreshing.discard(key)
+
+        threading.Thread(target=run, daemon=True).start()
+
+    #this is stale-while-revalidate lookup: this serves fresh hits directly, serves stale hits immediately while refreshing in the background, and only blocks on the upstream when nothing usable is cached, joining any fetch of the same key already in flight, and this is why we do it like this so dashboard users almost never wait on the world bank
+    def get_or_fetch(self, key, fetch_fn, ttl, stale_ttl=0):
+        value, state = self.get(key)
+        if state == 'fresh':
+            self.hits += 1
+            metrics.inc('symbiosis_cache_requests_total', cache=self.name, result='hit')
+            return value
+        if state == 'stale':
+            self.stale_hits += 1
+            metrics.inc('symbiosis_cache_requests_total', cache=self.name, result='stale')
+            self._refresh(key, fetch_fn, ttl, stale_ttl)
+            return value
+
+        # edge case: concurrent misses on one key share a single fetch, so a batch that overlaps the warm-up prefetch doesn't call the upstream twice
+        with self.lock:
+            pending = self.inflight.get(key)
+            leader = pending is None
+            if leader:
+                pending = self.inflight[key] = threading.Event()
+        if not leader:
+            metrics.inc('symbiosis_cache_requests_total', cache=self.name, result='shared')
+            pending.wait()
+            return self.get(key)[0]
+
+        self.misses += 1
+        metrics.inc('symbiosis_cache_requests_total', cache=self.name, result='miss')
+        try:
+            fresh = fetch_fn()
+            if fresh is None:
+                # edge case: if the upstream is down, an expired value is still better than an empty chart
+                return value
+            self.set(key, fresh, ttl, stale_ttl)
+            return fresh
+        finally:
+            with self.lock:
+                del self.inflight[key]
+            pending.set()
+
+#this is answer caching: this remembers llm answers under an exact key (normalized query plus retrieved source ids) and, optionally, under the query embedding for near-duplicate questions, and this is why we do it like this because llm calls dominate both latency and spend while our traffic is heavily repetitive
+class AnswerCache:
+    def __init__(self, max_size=256, ttl=3600, similarity=0.97):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.similarity = similarity
+        self.exact = TTLCache(max_size=max_size, name='answer')
+        self.semantic = OrderedDict()
+        self.lock = threading.Lock()
+        self.semantic_hits = 0
+        # edge case: bumped by every invalidation so an answer computed against an older vector store can't be stored after the rebuild
+        self.generation = 0
+
+    #this is query normalization: this lowercases and collapses whitespace, and this is why we do it like this so trivially different spellings of the same question share one entry
+    @staticmethod
+    def normalize(query):
+        return " ".join(str(query).lower().split())
+
+    def _exact_key(self, query, sources):
+        return self.normalize(query) + "|" + ",".join(str(s) for s in sources)
+
+    def get_exact(self, query, sources):
+        value = self.exact.peek(self._exact_key(query, sources))
+        metrics.inc('symbiosis_cache_requests_total', cache='answer', result='miss' if value is None else 'hit')
+        return value
+
+    #this is semantic lookup: this compares the query embedding against every live cached embedding by cosine similarity and returns the closest answer above the threshold, and this is why we do it like this so rephrased questions skip both retrieval and the llm
+    def get_similar(self, embedding):
+        if not self.similarity or embedding is None:
+            return None
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        if not norm:
+            return None
+        vector = vector / norm
+
+        now = time.time()
+        with self.lock:
+            for key in [k for k, entry in self.semantic.items() if entry[2] <= now]:
+                del self.semantic[key]
+            if not self.semantic:
+                return None
+            keys = list(self.semantic)
+            matrix = np.vstack([self.semantic[k][0] for k in keys])
+            scores = matrix @ vector
+            best = int(np.argmax(scores))
+            if scores[best] < self.similarity:
+                return None
+            self.semantic.move_to_end(keys[best])
+            self.semantic_hits += 1
+            metrics.inc('symbiosis_cache_requests_total', cache='answer', result='semantic_hit')
+            return self.semantic[keys[best]][1]
+
+    def put(self, query, sources, answer, embedding=None, generation=None):
+        value = [answer, list(sources)]
+        vector = None
+        if self.similarity and embedding is not None:
+            vector = np.asarray(embedding, dtype=np.float32)
+            norm = np.linalg.norm(vector)
+            # edge case: a zero vector has no direction to compare against, so it only lives in the exact tier
+            vector = vector / norm if norm else None
+        with self.lock:
+            # edge case: the answer was grounded in a store that has since been replaced, so it is dropped rather than cached
+            if generation is not None and generation != self.generation:
+                return
+            self.exact.set(self._exact_key(query, sources), value, self.ttl)
+            if vector is None:
+                return
+            key = self.normalize(query)
+            self.semantic[key] = (vector, value, time.time() + self.ttl)
+            self.semantic.move_to_end(key)
+            while len(self.semantic) > self.max_size:
+                self.semantic.popitem(last=False)
+
+    #this is invalidation: this drops both tiers, and this is why we do it like this so answers grounded in an old vector store are never served after a rebuild
+    def invalidate(self):
+        with self.lock:
+            self.generation += 1
+            self.semantic.clear()
+        self.exact.clear()
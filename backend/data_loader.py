@@ -1,14 +1,19 @@
 #this is imports and class setup: this imports pandas and the requests library for our live apis, and it sets up the data manager class, and this is why we do it like this to create a single source of truth for all data variables and external api calls
 import pandas as pd
-import itertools
 import numpy as np
-import requests
 import os
+import json
+import time
+import hashlib
+import threading
+from concurrent.futures import wait
+from backend import http_client, metrics
+from backend.search_index import SearchIndex
+from backend.cache import TTLCache
+from backend.policy_store import PolicyStore
 
 class DataManager:
     def __init__(self):
-        self.policies_df = pd.DataFrame()
-        self.metrics_df = pd.DataFrame() 
         self.tag_columns = [
             'renewable_energy', 'carbon_pricing', 'plastic_reduction',
             'emissions_reduction', 'electric_vehicles', 'conservation',
@@ -27,122 +32,524 @@ class DataManager:
             "South Africa": "ZA", "Mexico": "MX", "South Korea": "KR"
         }
         
-        self.load_data()
+        # edge case: the dashboard uses full country names while the policy csv abbreviates a few of them
+        self.policy_country_aliases = {"United States": "USA", "United Kingdom": "UK"}
+        
+        # edge case: graph_max_neighbors caps every graph, while graphs past graph_large_nodes policies are always held to graph_large_neighbors, because the uncapped edge list grows quadratically (millions of edges at 10k policies); this leaves the shipped map with every link
+        self.min_shared_tags = int(os.environ.get('graph_min_shared_tags', 2))
+        self.max_neighbors = int(os.environ.get('graph_max_neighbors', 0))
+        self.large_graph_nodes = int(os.environ.get('graph_large_nodes', 2000))
+        self.large_graph_neighbors = int(os.environ.get('graph_large_neighbors', 20))
+        self.csv_path = os.environ.get('policies_csv', 'data/policies.csv')
+        self.reload_lock = threading.Lock()
+        self.reload_listeners = []
+        # edge case: the csv is loaded by load_data (usually on a startup thread), so requests can wait on this event instead of the import blocking
+        self.loaded = threading.Event()
+        self.load_error = None
+        self.csv_signature = None
+        self.search_fields = ['title', 'summary', 'plain_summary', 'country', 'region', 'category', 'type', 'tags']
+        # edge case: everything derived from the csv lives in one dict that is swapped in a single assignment, so a request never sees a new store with an old index
+        self.snapshot = {
+            "store": PolicyStore(pd.DataFrame(columns=['id']), self.tag_columns),
+            "search_index": SearchIndex(self.search_fields),
+            "graph_nodes": [],
+            "version": 0
+        }
+        # edge case: entries are whole serialized bodies, so the cache is also bounded by their total size (graph_cache_max_bytes, default 64 MB)
+        self.graph_cache = TTLCache(
+            max_size=int(os.environ.get('graph_cache_size', 128)),
+            name='graph',
+            max_bytes=int(os.environ.get('graph_cache_max_bytes', 64 * 1024 * 1024)),
+            size_fn=lambda entry: len(entry[0])
+        )
+        
+        # edge case: world bank yearly series change a few times a year while openaq is live, so each source gets its own ttl and stale window (seconds)
+        self.wb_ttl = int(os.environ.get('wb_cache_ttl', 86400))
+        self.wb_stale_ttl = int(os.environ.get('wb_cache_stale_ttl', 30 * 86400))
+        self.aqi_ttl = int(os.environ.get('openaq_cache_ttl', 600))
+        self.aqi_stale_ttl = int(os.environ.get('openaq_cache_stale_ttl', 3600))
+        # edge case: updated to the modern AR5 CO2 indicator because the legacy indicator was deprecated and returns empty arrays
+        self.wb_indicators = {
+            "co2": "EN.GHG.CO2.PC.CE.AR5",
+            "renewables": "EG.FEC.RNEW.ZS",
+            "aqi": "EN.ATM.PM25.MC.M3"
+        }
+        
+        # edge case: base urls can point at local stand-ins (see benchmarks/) so telemetry runs offline with controlled latency
+        self.worldbank_base_url = os.environ.get('worldbank_base_url', 'https://api.worldbank.org/v2').rstrip('/')
+        self.openaq_base_url = os.environ.get('openaq_base_url', 'https://api.openaq.org/v2').rstrip('/')
+        
+        # edge case: one overall budget for all upstream calls, so a slow source degrades to nulls instead of stacking its full timeout onto the response
+        self.telemetry_deadline = float(os.environ.get('telemetry_deadline', 8))
+        self.telemetry_cache = TTLCache(
+            max_size=int(os.environ.get('telemetry_cache_size', 512)),
+            path=os.environ.get('telemetry_cache_path', 'data/telemetry_cache.json') or None,
+            name='telemetry',
+            save_delay=float(os.environ.get('telemetry_cache_save_delay', 5))
+        )
 
-    #this is data loading: this reads the policies csv file into a pandas dataframe, and this is why we do it like this because policies are static text that require vectorization, unlike our telemetry which is now dynamic
-    def load_data(self):
+    @property
+    def store(self):
+        return self.snapshot["store"]
+
+    @property
+    def search_index(self):
+        return self.snapshot["search_index"]
+
+    @property
+    def graph_nodes(self):
+        return self.snapshot["graph_nodes"]
+
+    #this is csv reading: this reads the policies csv file into a pandas dataframe and immediately compacts it into the typed policy store, and this is why we do it like this because policies are static text that require vectorization, unlike our telemetry which is now dynamic, and the hot paths only need codes, masks and indexes
+    def _read_store(self, missing_ok=False):
         try:
-            self.policies_df = pd.read_csv('data/policies.csv')
-            self.policies_df['id'] = self.policies_df['id'].astype(str)
+            signature = self._csv_signature()
+            with metrics.timed('csv_load'):
+                policies_df = pd.read_csv(self.csv_path)
+                policies_df['id'] = policies_df['id'].astype(str)
+            # edge case: a file rewritten while it was being read may have parsed only in part, so the read is failed and left for the next poll
+            if self._csv_signature() != signature:
+                raise ValueError(f"'{self.csv_path}' changed while it was being read.")
+            # edge case: the signature is only recorded after a successful read, so a version that failed to parse is retried rather than skipped
+            self.csv_signature = signature
         except FileNotFoundError:
-            print("critical error: 'data/policies.csv' not found.")
-            self.policies_df = pd.DataFrame(columns=['id', 'title', 'country', 'year', 'category', 'type', 'summary', 'effectiveness', 'official_url'])
+            # edge case: only the first load falls back to an empty store; on reload a missing file (deleted mid-save) must not be read as "every policy was removed"
+            if not missing_ok:
+                raise FileNotFoundError(f"'{self.csv_path}' not found; keeping the loaded policies.")
+            print(f"critical error: '{self.csv_path}' not found.")
+            policies_df = pd.DataFrame(columns=['id', 'title', 'country', 'year', 'category', 'type', 'summary', 'effectiveness', 'official_url'])
+        with metrics.timed('store_build'):
+            return PolicyStore(policies_df, self.tag_columns)
 
-    #this is graph data generation: this filters policies based on queries and builds node and edge arrays, and it maps shared tags using itertools combinations, and this is why we do it like this to dynamically format raw csv data into the exact structure vis.js expects
-    def get_graph_data(self, search_query, category_filter, type_filter):
-        filtered_df = self.policies_df.copy()
+    #this is snapshot swapping: this builds the search index and graph nodes for a store off to the side and then publishes all of them with one assignment, and this is why we do it like this so reloads are atomic for concurrent requests
+    def _publish(self, store):
+        with metrics.timed('index_build', index='search'):
+            search_index = self._build_search_index(store)
+        with metrics.timed('index_build', index='graph_nodes'):
+            graph_nodes = self._build_graph_nodes(store)
+        self.snapshot = {
+            "store": store,
+            "search_index": search_index,
+            "graph_nodes": graph_nodes,
+            "version": self.snapshot["version"] + 1
+        }
+        # edge case: cached graph responses describe the old rows, so they go whenever the csv is (re)loaded
+        self.graph_cache.clear()
 
-        if search_query:
-            mask = filtered_df.astype(str).apply(
-                lambda x: x.str.lower().str.contains(search_query.lower())
-            ).any(axis=1)
-            filtered_df = filtered_df[mask]
+    #this is initial loading: this reads and publishes the csv once and then marks the data manager as loaded, recording rather than raising a failure, and this is why we do it like this so the web server can bind before the csv is parsed and a malformed file reports through readiness instead of killing startup
+    def load_data(self):
+        try:
+            self._publish(self._read_store(missing_ok=True))
+        except Exception as e:
+            print(f"critical error: could not load '{self.csv_path}': {e}")
+            self.load_error = str(e)
+        finally:
+            self.loaded.set()
+
+    def wait_until_loaded(self, timeout=None):
+        return self.loaded.wait(timeout)
+
+    @property
+    def status(self):
+        if not self.loaded.is_set():
+            return 'loading'
+        return 'error' if self.load_error else 'ready'
+
+    def _csv_signature(self):
+        stat = os.stat(self.csv_path)
+        return (stat.st_mtime_ns, stat.st_size)
+
+    #this is hot reload: this re-reads the csv, diffs it against the loaded store by id and content, swaps in the new data only if something changed, and tells listeners (the rag engine) which rows moved, and this is why we do it like this so analysts can update the corpus without restarting the app
+    def reload(self):
+        with self.reload_lock:
+            new_store = self._read_store()
+            diff = self.store.diff(new_store)
+            if not any(diff.values()):
+                return diff
+            
+            self._publish(new_store)
+            print(f"policies reloaded: {len(diff['added'])} added, {len(diff['changed'])} changed, {len(diff['removed'])} removed.")
+            for listener in self.reload_listeners:
+                try:
+                    listener(new_store, diff)
+                except Exception as e:
+                    print(f"reload listener error: {e}")
+            return diff
+
+    def on_reload(self, listener):
+        self.reload_listeners.append(listener)
 
-        if category_filter:
-            filtered_df = filtered_df[filtered_df['category'] == category_filter]
-        if type_filter:
-            filtered_df = filtered_df[filtered_df['type'] == type_filter]
+    #this is file watching: this polls the csv's modification time and size on a daemon thread and reloads once they have changed and then held still for a second poll, and this is why we do it like this because a stat call every few seconds is cheap and works on every platform without an extra dependency, and waiting for a steady signature keeps a half-written save from being loaded as a truncated corpus
+    def start_file_watch(self, interval):
+        def run():
+            pending = None
+            while True:
+                time.sleep(interval)
+                try:
+                    signature = self._csv_signature()
+                    if signature == self.csv_signature:
+                        pending = None
+                        continue
+                    # edge case: the first poll that sees a new signature only records it; the reload waits until the next poll finds it unchanged
+                    if signature != pending:
+                        pending = signature
+                        continue
+                    self.reload()
+                except FileNotFoundError:
+                    # edge case: editors often delete and recreate the file while saving, so a brief absence is skipped rather than loading an empty corpus
+                    pending = None
+                    continue
+                except Exception as e:
+                    print(f"policies watch error: {e}")
 
+        thread = threading.Thread(target=run, name='policies-watch', daemon=True)
+        thread.start()
+        return thread
+
+    #this is node precomputation: this renders every policy's vis.js node, tooltip html included, once at load time, and this is why we do it like this because the tooltip only depends on the static csv row and re-rendering it with iterrows on every request was the bulk of /api/graph
+    def _build_graph_nodes(self, store):
         nodes = []
-        for _, row in filtered_df.iterrows():
-            active_tags = [tag for tag in self.tag_columns if row.get(tag) == 'Yes']
+        for i, row in enumerate(store.records()):
+            active_tags = store.active_tags(i)
             tags_html = "<br><br><b>tags:</b> " + ", ".join(active_tags) if active_tags else ""
             
-            url = row.get('official_url')
-            url_html = f"<br><br><a href='{url}' target='_blank' style='color: var(--accent); text-decoration: none; font-weight: 600;'>view official document &rarr;</a>" if pd.notna(url) else ""
+            url = row['official_url']
+            url_html = f"<br><br><a href='{url}' target='_blank' style='color: var(--accent); text-decoration: none; font-weight: 600;'>view official document &rarr;</a>" if url is not None else ""
             
-            country_clean = str(row['country']).replace("'", "\\'")
+            country_clean = row['country'].replace("'", "\\'")
             telemetry_btn = (
                 f"<br><br><button onclick=\"window.openTelemetry('{country_clean}')\" "
                 "class='btn-telemetry'>view country telemetry 📊</button>"
             )
             
             nodes.append({
-                "id": str(row['id']),
-                "label": str(row['title']),
-                "group": str(row['category']),
+                "id": row['id'],
+                "label": row['title'],
+                "group": row['category'],
                 "title": f"<b>{row['title']}</b><br>{row['summary']}{tags_html}{url_html}{telemetry_btn}"
             })
+        return nodes
 
-        edges = []
-        min_shared_tags = 2
+    #this is search index building: this feeds the text columns plus the readable names of each policy's active tags into the inverted index, and this is why we do it like this so searching 'carbon' also finds policies tagged carbon_pricing
+    def _build_search_index(self, store):
+        records = []
+        for i, row in enumerate(store.records()):
+            row['tags'] = " ".join(store.active_tags(i))
+            records.append(row)
+        return SearchIndex(self.search_fields).build(records)
 
-        if not filtered_df.empty:
-            for id1, id2 in itertools.combinations(filtered_df['id'], 2):
-                policy1 = filtered_df[filtered_df['id'] == id1].iloc[0]
-                policy2 = filtered_df[filtered_df['id'] == id2].iloc[0]
-                
-                shared_count = sum(1 for tag in self.tag_columns if policy1.get(tag) == 'Yes' and policy2.get(tag) == 'Yes')
-                
-                if shared_count >= min_shared_tags:
-                    edges.append({
-                        "from": str(id1),
-                        "to": str(id2),
-                        "value": shared_count,
-                        "title": f"shared {shared_count} tags"
-                    })
+    #this is shared tag edge computation: this multiplies the tag rows of the filtered policies against each other in fixed-size blocks to count shared tags, and it optionally limits every node to its strongest max_neighbors links, and this is why we do it like this so memory stays bounded and edge payloads don't explode on tens of thousands of policies
+    def _shared_tag_edges(self, matrix, min_shared_tags, max_neighbors):
+        n = matrix.shape[0]
+        sources, targets, counts = [], [], []
+        if n < 2:
+            return np.array([], dtype=np.int64), np.array([], dtype=np.int64), np.array([], dtype=np.int64)
+        
+        # edge case: float32 keeps the product on the blas path, and counts never exceed fifteen so they stay exact
+        dense = matrix.astype(np.float32)
+        block = max(1, 4_000_000 // n)
+        
+        capped = bool(max_neighbors) and max_neighbors < n - 1
+        
+        for start in range(0, n, block):
+            stop = min(start + block, n)
+            rows = np.arange(stop - start)
+            
+            if capped:
+                # edge case: candidates are the top-k of either endpoint, so each block is compared against every row instead of just the upper triangle
+                shared = dense[start:stop] @ dense.T
+                shared[rows, rows + start] = 0
+                shared[shared < min_shared_tags] = 0
+                top = np.argpartition(-shared, max_neighbors - 1, axis=1)[:, :max_neighbors]
+                keep = np.zeros(shared.shape, dtype=bool)
+                keep[rows[:, None], top] = True
+                r, c = np.nonzero(keep & (shared > 0))
+                offset = 0
+            else:
+                # edge case: only the upper triangle is needed for unordered pairs, so each block is compared against itself and later rows only
+                shared = dense[start:stop] @ dense[start:].T
+                mask = shared >= max(min_shared_tags, 1)
+                mask[np.tril_indices(stop - start, 0, mask.shape[1])] = False
+                r, c = np.nonzero(mask)
+                offset = start
+            
+            sources.append(r + start)
+            targets.append(c + offset)
+            counts.append(shared[r, c].astype(np.int64))
+        
+        src, dst, cnt = np.concatenate(sources), np.concatenate(targets), np.concatenate(counts)
+        
+        if capped:
+            # edge case: a pair chosen by both endpoints would show up twice, so normalize direction and dedupe in pair order
+            lo, hi = np.minimum(src, dst), np.maximum(src, dst)
+            _, first = np.unique(lo * n + hi, return_index=True)
+            src, dst, cnt = lo[first], hi[first], cnt[first]
+            
+            # edge case: the union of top-k lists can still give a hub many more than k links, so candidates are accepted strongest first while both endpoints have room
+            keep = np.zeros(len(src), dtype=bool)
+            degree = [0] * n
+            src_list, dst_list = src.tolist(), dst.tolist()
+            for e in np.lexsort((dst, src, -cnt)).tolist():
+                i, j = src_list[e], dst_list[e]
+                if degree[i] < max_neighbors and degree[j] < max_neighbors:
+                    keep[e] = True
+                    degree[i] += 1
+                    degree[j] += 1
+            src, dst, cnt = src[keep], dst[keep], cnt[keep]
+        
+        return src, dst, cnt
+
+    #this is graph data generation: this filters policies based on queries and builds node and edge arrays, and it maps shared tags through the precomputed tag matrix, and this is why we do it like this to dynamically format raw csv data into the exact structure vis.js expects
+    def get_graph_data(self, search_query, category_filter, type_filter, min_shared_tags=None, max_neighbors=None):
+        # edge case: read the snapshot once so a reload mid-request can't mix rows from two different csv versions
+        snapshot = self.snapshot
+        rows = None
+
+        if search_query:
+            rows = np.asarray(snapshot["search_index"].search(search_query), dtype=np.int64)
+
+        rows = snapshot["store"].filter(rows, category=category_filter, type=type_filter)
+
+        nodes = [snapshot["graph_nodes"][i] for i in rows.tolist()]
+
+        min_shared_tags, max_neighbors = self._edge_settings(min_shared_tags, max_neighbors)
+        # edge case: a large filtered set always gets a cap, so an empty search on a big corpus can't build a quadratic edge list
+        if self.large_graph_neighbors > 0 and len(rows) > self.large_graph_nodes:
+            max_neighbors = min(max_neighbors or self.large_graph_neighbors, self.large_graph_neighbors)
+
+        edges = []
+        ids = [node["id"] for node in nodes]
+        with metrics.timed('graph_edges'):
+            src, dst, cnt = self._shared_tag_edges(snapshot["store"].tag_matrix(rows), min_shared_tags, max_neighbors)
+        
+        for i, j, shared_count in zip(src.tolist(), dst.tolist(), cnt.tolist()):
+            edges.append({
+                "from": ids[i],
+                "to": ids[j],
+                "value": shared_count,
+                "title": f"shared {shared_count} tags"
+            })
 
         return {"nodes": nodes, "edges": edges}
 
+    #this is edge setting clamping: this lets a request raise the shared-tag threshold or lower the neighbor cap but never loosen either past the server settings, and this is why we do it like this so an anonymous ?max_neighbors=0 can't bring back the quadratic edge list the operator capped
+    def _edge_settings(self, min_shared_tags=None, max_neighbors=None):
+        floor = max(self.min_shared_tags, 1)
+        # edge case: thresholds past the tag count all mean "no edges", so they share one value (and one cache entry)
+        min_shared_tags = min(max(min_shared_tags or floor, floor), len(self.tag_columns) + 1)
+        if not max_neighbors or max_neighbors < 0:
+            max_neighbors = self.max_neighbors
+        elif self.max_neighbors:
+            max_neighbors = min(max_neighbors, self.max_neighbors)
+        return min_shared_tags, max_neighbors
+
+    #this is graph response caching: this serializes the graph for a (search, category, type, edge settings) combination once and keeps the bytes plus a strong etag in an lru cache, and this is why we do it like this so the unfiltered map and repeated re-filters are served straight from memory
+    def get_graph_response(self, search_query, category_filter, type_filter, min_shared_tags=None, max_neighbors=None):
+        min_shared_tags, max_neighbors = self._edge_settings(min_shared_tags, max_neighbors)
+        # edge case: search is case- and whitespace-insensitive, so equivalent queries share one cache entry
+        # edge case: the data version is part of the key so a response built from the old csv during a reload is never served afterwards
+        key = json.dumps([self.snapshot["version"], " ".join(str(search_query).lower().split()), category_filter, type_filter, min_shared_tags, max_neighbors])
+        
+        def build():
+            payload = self.get_graph_data(search_query, category_filter, type_filter, min_shared_tags, max_neighbors)
+            body = json.dumps(payload, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+            return body, hashlib.sha1(body).hexdigest()
+        
+        return self.graph_cache.get_or_fetch(key, build, ttl=float('inf'))
+
     #this is world bank api integration: this fetches historical indicator data spanning the last 60 years to ensure we don't miss delayed data, and it returns a dictionary mapping years to values, and this is why we do it like this to replace static csv files with authoritative global data
-    def fetch_wb_indicator(self, iso_code, indicator):
+    def _download_wb_indicator(self, iso_code, indicator):
         # edge case: expanded per_page to 60 because recent years (2024/2025) are often null, and asking for only 15 records cuts off usable history
-        url = f"https://api.worldbank.org/v2/country/{iso_code}/indicator/{indicator}?format=json&per_page=60"
+        url = f"{self.worldbank_base_url}/country/{iso_code}/indicator/{indicator}?format=json&per_page=60"
         try:
-            res = requests.get(url, timeout=30)
+            res = http_client.get(url, timeout=(3.05, 30))
             if res.status_code == 200:
                 data = res.json()
-                if len(data) > 1 and data[1]:
-                    # edge case: ignore none values and convert to a dictionary sorted by year
-                    valid_data = {int(item['date']): item['value'] for item in data[1] if item['value'] is not None}
-                    return valid_data
+                # edge case: the api reports errors as a 200 with a single [{"message": ...}] element; only a real [meta, null] reply means "no data" and may be cached as empty
+                if not isinstance(data, list) or len(data) < 2:
+                    print(f"world bank api error for {indicator}: {data}")
+                    metrics.inc('symbiosis_upstream_errors_total', source='worldbank')
+                    return None
+                # edge case: ignore none values, and keep years as strings so the series survives the json cache file unchanged
+                return {str(item['date']): item['value'] for item in data[1] or [] if item['value'] is not None}
+            print(f"world bank api error for {indicator}: status {res.status_code}")
+            metrics.inc('symbiosis_upstream_errors_total', source='worldbank')
         except Exception as e:
             print(f"world bank api error for {indicator}: {e}")
-        return {}
+            metrics.inc('symbiosis_upstream_errors_total', source='worldbank')
+        return None
+
+    #this is bulk world bank integration: this asks for one indicator across many countries in a single semicolon-joined query and follows its pages, and it splits the rows back out per country, and this is why we do it like this so warming seventeen countries costs a few requests instead of fifty-one
+    def _download_wb_indicator_bulk(self, iso_codes, indicator):
+        this_year = time.localtime().tm_year
+        base = f"{self.worldbank_base_url}/country/{';'.join(iso_codes)}/indicator/{indicator}"
+        series = {code: {} for code in iso_codes}
+        page, pages = 1, 1
+        
+        try:
+            while page <= pages:
+                # edge case: a date window instead of per_page=60 keeps the same sixty-year history per country when countries are interleaved in one response
+                res = http_client.get(f"{base}?format=json&per_page=1000&date={this_year - 59}:{this_year}&page={page}", timeout=(3.05, 30))
+                if res.status_code != 200:
+                    print(f"world bank bulk api error for {indicator}: status {res.status_code}")
+                    metrics.inc('symbiosis_upstream_errors_total', source='worldbank')
+                    return None
+                data = res.json()
+                # edge case: an error reply on any page (a 200 with only [{"message": ...}]) fails the whole call, so a partial download is never cached as complete
+                if not isinstance(data, list) or len(data) < 2:
+                    print(f"world bank bulk api error for {indicator}: {data}")
+                    metrics.inc('symbiosis_upstream_errors_total', source='worldbank')
+                    return None
+                if not data[1]:
+                    break
+                pages = int(data[0].get('pages', 1))
+                for item in data[1]:
+                    code = (item.get('country') or {}).get('id')
+                    if code in series and item['value'] is not None:
+                        series[code][str(item['date'])] = item['value']
+                page += 1
+        except Exception as e:
+            print(f"world bank bulk api error for {indicator}: {e}")
+            metrics.inc('symbiosis_upstream_errors_total', source='worldbank')
+            return None
+        return series
+
+    #this is cached world bank lookup: this serves the series from the ttl cache and only downloads when it is missing, and this is why we do it like this so repeated dashboard views don't re-download sixty records per indicator
+    def fetch_wb_indicator(self, iso_code, indicator):
+        series = self.telemetry_cache.get_or_fetch(
+            f"wb:{iso_code}:{indicator}",
+            lambda: self._download_wb_indicator(iso_code, indicator),
+            self.wb_ttl, self.wb_stale_ttl
+        )
+        return {int(year): value for year, value in (series or {}).items()}
 
     #this is live openaq integration: this fetches the absolute latest pm2.5 measurements from live sensors, and this is why we do it like this to append a true real-time snapshot to the end of our historical world bank charts
-    def get_live_aqi(self, country_code):
-        api_key = os.environ.get('openaq_api_key')
-        if not api_key or not country_code: return None
-            
-        url = f"https://api.openaq.org/v2/latest?country={country_code}&parameter=pm25&limit=100"
+    def _download_live_aqi(self, country_code, api_key):
+        url = f"{self.openaq_base_url}/latest?country={country_code}&parameter=pm25&limit=100"
         headers = {"X-AQ-API-Key": api_key}
         
         try:
-            response = requests.get(url, headers=headers, timeout=5)
+            response = http_client.get(url, headers=headers, timeout=(3.05, 5))
             if response.status_code == 200:
                 results = response.json().get('results', [])
                 measurements = [m.get('value') for loc in results for m in loc.get('measurements', []) if m.get('parameter') == 'pm25' and m.get('value', -1) >= 0]
-                            
-                if measurements:
-                    return round(sum(measurements) / len(measurements), 2)
+                
+                # edge case: wrap the reading so "no sensors reporting" can be cached while a failed request (None) is not
+                return {"value": round(sum(measurements) / len(measurements), 2) if measurements else None}
+            print(f"openaq api error: status {response.status_code}")
+            metrics.inc('symbiosis_upstream_errors_total', source='openaq')
         except Exception as e:
             print(f"openaq api error: {e}")
+            metrics.inc('symbiosis_upstream_errors_total', source='openaq')
             
         return None
 
-    #this is telemetry alignment: this calls all apis simultaneously and stitches the disparate timelines together into a single cohesive x-axis array, and this is why we do it like this so chart.js doesn't misalign the data points
+    #this is cached openaq lookup: this serves the latest reading from the short-ttl cache, and this is why we do it like this so a burst of dashboard views shares one sensor query
+    def get_live_aqi(self, country_code):
+        api_key = os.environ.get('openaq_api_key')
+        if not api_key or not country_code: return None
+        
+        reading = self.telemetry_cache.get_or_fetch(
+            f"openaq:{country_code}",
+            lambda: self._download_live_aqi(country_code, api_key),
+            self.aqi_ttl, self.aqi_stale_ttl
+        )
+        return (reading or {}).get('value')
+
+    def policy_country(self, country):
+        return self.policy_country_aliases.get(country, country)
+
+    #this is telemetry prefetching: this finds which countries have no fresh cached series per indicator and fills them with one bulk world bank call each, plus the live openaq readings, and this is why we do it like this so a batch request or warm-up touches upstream once per indicator rather than once per country
+    def prefetch_telemetry(self, countries, deadline=None):
+        codes = sorted({self.iso_map[c] for c in countries if c in self.iso_map})
+        if not codes:
+            return
+
+        def fill(indicator, missing):
+            series = self._download_wb_indicator_bulk(missing, indicator)
+            # edge case: a failed bulk call leaves the keys alone so the per-country path can still fall back to stale values
+            # edge case: countries that got no rows are left to the per-country path rather than cached as empty for a day
+            for code, values in (series or {}).items():
+                if not values:
+                    continue
+                self.telemetry_cache.set(f"wb:{code}:{indicator}", values, self.wb_ttl, self.wb_stale_ttl)
+
+        futures = []
+        for indicator in self.wb_indicators.values():
+            missing = [code for code in codes if self.telemetry_cache.peek(f"wb:{code}:{indicator}") is None]
+            if missing:
+                futures.append(http_client.submit(fill, indicator, missing))
+        futures += [http_client.submit(self.get_live_aqi, code) for code in codes]
+        wait(futures, timeout=self.telemetry_deadline if deadline is None else max(0.0, deadline - time.monotonic()))
+
+    #this is batch telemetry: this prefetches every requested country in bulk, then starts every country's lookups at once and waits on them together, all under one deadline, and this is why we do it like this so the comparison dashboard gets every country from one round trip and a batch takes at most telemetry_deadline rather than one deadline per country
+    def get_telemetry_bulk(self, countries):
+        countries = list(dict.fromkeys(c for c in countries if c))
+        deadline = time.monotonic() + self.telemetry_deadline
+        self.prefetch_telemetry(countries, deadline)
+        
+        pending = {country: self._submit_telemetry(country) for country in countries}
+        wait([f for _, _, futures in pending.values() for f in futures.values()], timeout=max(0.0, deadline - time.monotonic()))
+        return {country: self._assemble_telemetry(*pending[country]) for country in countries}
+
+    #this is background warm-up: this starts a daemon thread that prefetches telemetry for every country in the iso map at startup and then on a fixed interval, and this is why we do it like this so dashboard views and country briefs find their series already cached
+    def start_warmup(self, interval):
+        def run():
+            while True:
+                try:
+                    self.prefetch_telemetry(list(self.iso_map))
+                except Exception as e:
+                    print(f"telemetry warm-up error: {e}")
+                time.sleep(interval)
+
+        thread = threading.Thread(target=run, name='telemetry-warmup', daemon=True)
+        thread.start()
+        return thread
+
+    #this is telemetry alignment: this calls all apis concurrently on the shared upstream pool and stitches the disparate timelines together into a single cohesive x-axis array, and this is why we do it like this so latency is the slowest source rather than the sum of all four, and chart.js doesn't misalign the data points
     def get_telemetry(self, country):
+        country_code, c_events, futures = self._submit_telemetry(country)
+        wait(futures.values(), timeout=self.telemetry_deadline)
+        return self._assemble_telemetry(country_code, c_events, futures)
+
+    #this is telemetry submission: this looks up the country's policy events and starts its world bank and openaq lookups on the upstream pool without waiting, and this is why we do it like this so single and batch requests share one code path but a batch can wait on every country at once
+    def _submit_telemetry(self, country):
         country_code = self.iso_map.get(country)
         if not country_code:
-            return {"metrics": {"years": [], "co2": [], "renewables": [], "aqi": []}, "events": []}
+            return None, [], {}
             
-        c_events = self.policies_df[self.policies_df['country'] == country][['year', 'title']].to_dict('records')
+        # edge case: missing years are stored as -1 in the policy store and reported as null
+        # edge case: events use the same csv country name as the brief filters, so United States and United Kingdom find their USA and UK rows
+        store = self.store
+        c_events = [
+            {"year": int(store.years[i]) if store.years[i] >= 0 else None, "title": store.text['title'][i]}
+            for i in store.positions('country', self.policy_country(country)).tolist()
+        ]
         
-        # edge case: updated to the modern AR5 CO2 indicator because the legacy indicator was deprecated and returns empty arrays
-        wb_co2 = self.fetch_wb_indicator(country_code, "EN.GHG.CO2.PC.CE.AR5")
-        wb_renew = self.fetch_wb_indicator(country_code, "EG.FEC.RNEW.ZS")
-        wb_aqi = self.fetch_wb_indicator(country_code, "EN.ATM.PM25.MC.M3")
+        futures = {name: http_client.submit(self.fetch_wb_indicator, country_code, code) for name, code in self.wb_indicators.items()}
+        futures["live_aqi"] = http_client.submit(self.get_live_aqi, country_code)
+        return country_code, c_events, futures
+
+    #this is telemetry assembly: this reads whichever lookups finished in time and stitches the payload, and this is why we do it like this so a slow source degrades to nulls instead of stalling the response
+    def _assemble_telemetry(self, country_code, c_events, futures):
+        if not country_code:
+            return {"metrics": {"years": [], "co2": [], "renewables": [], "aqi": []}, "events": []}
+        
+        # edge case: sources still running at the deadline are reported as missing; they keep running and land in the cache for the next request
+        # edge case: misses are counted rather than printed, so one slow batch doesn't log a line per source per country
+        results = {}
+        for name, future in futures.items():
+            results[name] = None
+            if not future.done():
+                metrics.inc('symbiosis_telemetry_missing_total', source=name, reason='deadline')
+            elif future.exception():
+                metrics.inc('symbiosis_telemetry_missing_total', source=name, reason='error')
+            else:
+                results[name] = future.result()
+        
+        wb_co2 = results["co2"] or {}
+        wb_renew = results["renewables"] or {}
+        wb_aqi = results["aqi"] or {}
         
         all_years = list(range(2010, 2027))
         
@@ -150,7 +557,7 @@ class DataManager:
         renew_list = [wb_renew.get(y) for y in all_years]
         aqi_list = [wb_aqi.get(y) for y in all_years]
         
-        live_aqi = self.get_live_aqi(country_code)
+        live_aqi = results["live_aqi"]
         if live_aqi:
             aqi_list[-1] = live_aqi 
 
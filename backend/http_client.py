@@ -0,0 +1,38 @@
+#this is imports and setup: this imports requests with its connection-pooling adapter and a thread pool, and it builds one shared session for every upstream call, and this is why we do it like this so world bank and openaq requests reuse warm keep-alive connections instead of paying a fresh tcp/tls handshake each time
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+import requests
+from requests.adapters import HTTPAdapter
+from backend import metrics
+
+POOL_SIZE = int(os.environ.get('http_pool_size', 16))
+PER_HOST_LIMIT = int(os.environ.get('http_per_host_limit', 4))
+
+session = requests.Session()
+adapter = HTTPAdapter(pool_connections=8, pool_maxsize=POOL_SIZE)
+session.mount('https://', adapter)
+session.mount('http://', adapter)
+
+# edge case: the pool is sized to the connection pool so queued fetches wait on a thread rather than opening throwaway connections
+executor = ThreadPoolExecutor(max_workers=POOL_SIZE, thread_name_prefix='upstream')
+
+_host_limits = {}
+_host_limits_lock = threading.Lock()
+
+#this is per-host throttling: this hands out one bounded semaphore per upstream host, and this is why we do it like this so a burst of dashboard traffic can't open dozens of parallel connections to the same public api and get us rate limited
+def _host_limit(host):
+    with _host_limits_lock:
+        if host not in _host_limits:
+            _host_limits[host] = threading.BoundedSemaphore(PER_HOST_LIMIT)
+        return _host_limits[host]
+
+#this is pooled get: this runs a get through the shared session while holding the host's concurrency slot and times it per host, and this is why we do it like this so callers get pooling, throttling and upstream latency metrics without managing any of them
+def get(url, **kwargs):
+    host = urlsplit(url).netloc
+    with _host_limit(host), metrics.timed('upstream_http', host=host):
+        return session.get(url, **kwargs)
+
+def submit(fn, *args, **kwargs):
+    return executor.submit(fn, *args, **kwargs)
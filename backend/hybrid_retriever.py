@@ -0,0 +1,97 @@
+#this is imports and class setup: this imports numpy and faiss for local lexical scoring and filtered vector search, and it sets up the bm25 index and hybrid retriever, and this is why we do it like this so keyword-like questions can be answered without a remote embedding call and every query can be narrowed by metadata
+import math
+import numpy as np
+import faiss
+from backend.search_index import SearchIndex
+
+class BM25Index:
+    def __init__(self, texts, k1=1.5, b=0.75):
+        self.k1 = k1
+        self.b = b
+        self.size = len(texts)
+        self.postings = {}
+
+        lengths = np.zeros(self.size, dtype=np.float32)
+        for doc_id, text in enumerate(texts):
+            tokens = SearchIndex.tokenize(text)
+            lengths[doc_id] = len(tokens)
+            counts = {}
+            for token in tokens:
+                counts[token] = counts.get(token, 0) + 1
+            for token, count in counts.items():
+                self.postings.setdefault(token, ([], []))
+                self.postings[token][0].append(doc_id)
+                self.postings[token][1].append(count)
+
+        # edge case: posting lists are frozen into arrays once so scoring a term is a vectorized add, not a python loop over documents
+        self.postings = {t: (np.asarray(ids, dtype=np.int64), np.asarray(tf, dtype=np.float32)) for t, (ids, tf) in self.postings.items()}
+        average = float(lengths.mean()) if self.size else 0.0
+        self.norm = self.k1 * (1 - self.b + self.b * lengths / (average or 1.0))
+
+    #this is bm25 scoring: this adds each query term's idf-weighted, length-normalized term frequency into one score array, and this is why we do it like this because it is the standard lexical ranking and only touches the postings of the query's own terms
+    def scores(self, query):
+        scores = np.zeros(self.size, dtype=np.float32)
+        for token in set(SearchIndex.tokenize(query)):
+            if token not in self.postings:
+                continue
+            ids, tf = self.postings[token]
+            idf = math.log(1 + (self.size - len(ids) + 0.5) / (len(ids) + 0.5))
+            scores[ids] += idf * tf * (self.k1 + 1) / (tf + self.norm[ids])
+        return scores
+
+    def top(self, query, k, allowed=None):
+        scores = self.scores(query)
+        if allowed is not None:
+            masked = np.full(self.size, -1.0, dtype=np.float32)
+            masked[allowed] = scores[allowed]
+            scores = masked
+        order = np.argsort(-scores, kind='stable')[:k]
+        return [(int(i), float(scores[i])) for i in order if scores[i] > 0]
+
+#this is rank fusion: this merges several ranked lists by summing 1/(60 + rank) per document, and this is why we do it like this because bm25 scores and l2 distances live on different scales while ranks are directly comparable
+def reciprocal_rank_fusion(rankings, k=60):
+    fused = {}
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking):
+            fused[doc_id] = fused.get(doc_id, 0.0) + 1.0 / (k + rank + 1)
+    return sorted(fused, key=fused.get, reverse=True)
+
+class HybridRetriever:
+    def __init__(self, documents, index, lexical_max_terms=4, fetch_k=40):
+        self.documents = documents
+        self.index = index
+        self.bm25 = BM25Index([d.page_content for d in documents])
+        self.lexical_max_terms = lexical_max_terms
+        self.fetch_k = fetch_k
+
+    #this is keyword detection: this treats short queries with no question words as keyword lookups, and this is why we do it like this so searches like "carbon tax canada" skip the embedding round trip entirely
+    def is_keyword_query(self, query):
+        tokens = SearchIndex.tokenize(query)
+        question_words = {'what', 'why', 'how', 'which', 'who', 'when', 'where', 'compare', 'explain', 'should', 'could', 'would', 'does', 'is', 'are', 'can'}
+        return 0 < len(tokens) <= self.lexical_max_terms and not question_words.intersection(tokens)
+
+    #this is filtered vector search: this runs the faiss search restricted to the allowed row positions through an id selector, and this is why we do it like this so metadata filters apply before ranking instead of after a fixed top-k
+    def vector_top(self, embedding, k, allowed=None):
+        vector = np.asarray([embedding], dtype=np.float32)
+        k = min(k, self.index.ntotal if allowed is None else len(allowed))
+        if k <= 0:
+            return []
+        if allowed is None:
+            distances, ids = self.index.search(vector, k)
+        else:
+            params = faiss.SearchParameters(sel=faiss.IDSelectorBatch(np.asarray(allowed, dtype=np.int64)))
+            distances, ids = self.index.search(vector, k, params=params)
+        return [(int(i), float(d)) for i, d in zip(ids[0], distances[0]) if i >= 0]
+
+    #this is hybrid search: this ranks documents lexically and, unless the query is keyword-like, by vector similarity too, and fuses both rankings, and this is why we do it like this to get exact-term matches and semantic matches in one tighter context window
+    def search(self, query, k, embed_fn, allowed=None, lexical_only=None):
+        lexical = self.bm25.top(query, self.fetch_k, allowed)
+        if lexical_only is None:
+            lexical_only = self.is_keyword_query(query) and bool(lexical)
+        if lexical_only:
+            return [self.documents[i] for i, _ in lexical[:k]], None
+
+        embedding = embed_fn(query)
+        vector = self.vector_top(embedding, self.fetch_k, allowed)
+        fused = reciprocal_rank_fusion([[i for i, _ in lexical], [i for i, _ in vector]])
+        return [self.documents[i] for i in fused[:k]], embedding
@@ -0,0 +1,152 @@
+#this is imports and setup: this imports subprocess and a thread pool for background upload work, and it sets up the job manager, and this is why we do it like this so pdf parsing never runs on a flask request thread and can't starve the graph and telemetry endpoints
+import io
+import os
+import sys
+import json
+import time
+import uuid
+import threading
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from backend import metrics
+
+#this is pdf extraction: this runs inside a worker process, reads the pdf page by page into a list and joins it once at the end, and it enforces the page and time limits as it goes, and this is why we do it like this because extraction is cpu-bound and holds the gil, and repeated string concatenation is quadratic on big documents
+def extract_pdf_text(data, max_pages, time_limit):
+    import PyPDF2
+
+    started = time.monotonic()
+    reader = PyPDF2.PdfReader(io.BytesIO(data))
+    # edge case: reject oversized documents before touching any page content
+    if len(reader.pages) > max_pages:
+        raise ValueError(f"pdf has {len(reader.pages)} pages; the limit is {max_pages}.")
+
+    parts = []
+    for page in reader.pages:
+        # edge case: the limit is also checked between pages so an ordinary slow document fails with a clean error; a single page that hangs is caught by the parent, which kills the worker
+        if time.monotonic() - started > time_limit:
+            raise TimeoutError(f"pdf extraction exceeded {time_limit:g} seconds.")
+        text = page.extract_text()
+        if text:
+            parts.append(text)
+    return "\n".join(parts)
+
+class JobManager:
+    def __init__(self, max_workers=2, max_pages=300, time_limit=60, ttl=3600, analysis_workers=None):
+        self.max_workers = max_workers
+        self.max_pages = max_pages
+        self.time_limit = time_limit
+        self.ttl = ttl
+        self.jobs = {}
+        self.lock = threading.Lock()
+        self.thread_pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='upload-job')
+        # edge case: analysis waits on the llm for up to pdf_deadline, so it gets its own pool and a busy analysis never holds up the next extraction
+        self.analysis_pool = ThreadPoolExecutor(max_workers=analysis_workers or max_workers, thread_name_prefix='upload-analysis')
+
+    #this is bounded extraction: this runs one upload in a fresh `python -m backend.jobs` process, feeds it the pdf on stdin, and kills it if it misses the time limit, and this is why we do it like this so a pathological page can't hold a worker forever, and because a fresh interpreter never copies the app's running threads the way fork would nor re-imports the app's main module the way multiprocessing spawn and forkserver do; at most max_workers of these run at once because each is driven from a job thread
+    def _extract(self, data):
+        process = subprocess.Popen(
+            [sys.executable, '-m', 'backend.jobs', str(self.max_pages), str(self.time_limit)],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        )
+        try:
+            # edge case: a few seconds of slack over the in-worker limit covers interpreter start-up and a single slow page
+            out, err = process.communicate(data, timeout=self.time_limit + 5)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.communicate()
+            raise TimeoutError(f"pdf extraction exceeded {self.time_limit:g} seconds.")
+        try:
+            result = json.loads(out)
+        except ValueError:
+            # edge case: the worker died without answering (for example killed for memory)
+            raise RuntimeError(f"pdf extraction stopped unexpectedly (exit code {process.returncode}).")
+        if 'error' in result:
+            raise ValueError(result['error'])
+        return result['text']
+
+    def _update(self, job_id, **fields):
+        with self.lock:
+            self.jobs[job_id].update(fields, updated=time.time())
+
+    #this is job expiry: this forgets finished jobs after their ttl, and this is why we do it like this so extracted text and results don't pile up in memory
+    def _expire(self):
+        cutoff = time.time() - self.ttl
+        with self.lock:
+            for job_id in [j for j, job in self.jobs.items() if job['updated'] < cutoff and job['status'] in ('done', 'error', 'extracted', 'streamed')]:
+                del self.jobs[job_id]
+
+    #this is job execution: this extracts the text in a worker process under the time limit and then hands any analysis to the analysis pool, and this is why we do it like this so each upload moves through clear statuses the client can poll and the extraction pool only ever does extraction
+    def _run(self, job_id, data, analyze_fn):
+        try:
+            self._update(job_id, status='extracting', started=time.time())
+            with metrics.timed('pdf_extraction'):
+                text = self._extract(data)
+
+            # edge case: gracefully fail if the pdf was just images and contained no actual text
+            if not text.strip():
+                self._update(job_id, status='error', error="could not extract readable text from this pdf. it may be a scanned image.")
+                return
+
+            if analyze_fn is None:
+                self._update(job_id, status='extracted', text=text, text_chars=len(text))
+                return
+
+            # edge case: the text goes straight to the analysis thread and is never stored on the job, so nothing else can claim it
+            self._update(job_id, status='analyzing', text_chars=len(text))
+            self.analysis_pool.submit(self._analyze, job_id, text, analyze_fn)
+        except Exception as e:
+            self._update(job_id, status='error', error=str(e) or e.__class__.__name__)
+
+    def _analyze(self, job_id, text, analyze_fn):
+        try:
+            answer, sources = analyze_fn(text)
+            self._update(job_id, status='done', answer=answer, sources=sources)
+        except Exception as e:
+            self._update(job_id, status='error', error=str(e) or e.__class__.__name__)
+
+    def submit(self, data, analyze_fn=None):
+        self._expire()
+        job_id = uuid.uuid4().hex
+        with self.lock:
+            self.jobs[job_id] = {"status": 'queued', "mode": 'stream' if analyze_fn is None else 'analyze', "created": time.time(), "updated": time.time()}
+        self.thread_pool.submit(self._run, job_id, data, analyze_fn)
+        return job_id
+
+    #this is status lookup: this returns a copy of the job without the raw extracted text, and this is why we do it like this so polling stays cheap even for very long documents
+    def status(self, job_id):
+        with self.lock:
+            job = self.jobs.get(job_id)
+            if job is None:
+                return None
+            return {k: v for k, v in job.items() if k != 'text'}
+
+    #this is text handoff: this blocks until extraction finishes and then claims the text, removing it from the job and marking the job streamed, and this is why we do it like this so the streaming endpoint can start analysis the moment the worker is done and a replayed stream request can't run the whole analysis again
+    def wait_for_text(self, job_id, poll=0.1):
+        deadline = None
+        while deadline is None or time.monotonic() < deadline:
+            with self.lock:
+                job = self.jobs.get(job_id)
+                if job is None:
+                    raise KeyError("unknown job id.")
+                if job['status'] == 'error':
+                    raise RuntimeError(job['error'])
+                if job['mode'] != 'stream' or job['status'] == 'streamed':
+                    raise RuntimeError("this job's text has already been claimed.")
+                if 'text' in job:
+                    text = job.pop('text')
+                    job.update(status='streamed', updated=time.time())
+                    return text
+                # edge case: time spent queued behind other uploads doesn't count; the clock starts when extraction does
+                if deadline is None and job['status'] != 'queued':
+                    deadline = time.monotonic() - (time.time() - job['started']) + self.time_limit + 10
+            time.sleep(poll)
+        raise TimeoutError("pdf extraction did not finish in time.")
+
+#this is the worker entry point: this reads the pdf from stdin, extracts it under the limits given as arguments, and prints the text or the error as json, and this is why we do it like this so the worker needs nothing from the app but this module
+if __name__ == '__main__':
+    try:
+        result = {"text": extract_pdf_text(sys.stdin.buffer.read(), int(sys.argv[1]), float(sys.argv[2]))}
+    except Exception as e:
+        result = {"error": str(e) or e.__class__.__name__}
+    sys.stdout.write(json.dumps(result))
@@ -0,0 +1,101 @@
+#this is imports and setup: this imports timing and threading helpers for a tiny in-process metrics registry, and this is why we do it like this so every stage (csv load, upstream calls, retrieval, llm, pdf extraction, graph building) reports latency in prometheus format without pulling in a client library
+import time
+import threading
+from contextlib import contextmanager
+
+# edge case: buckets span cache hits (milliseconds) up to slow llm generations (a minute and more)
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+_lock = threading.Lock()
+_counters = {}
+_histograms = {}
+_help = {}
+_local = threading.local()
+
+def _key(name, labels):
+    return name, tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+def describe(name, text):
+    _help[name] = text
+
+def inc(name, value=1, **labels):
+    key = _key(name, labels)
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + value
+
+#this is histogram recording: this adds one observation to the cumulative buckets, sum and count for a label set, and this is why we do it like this because that is exactly the shape prometheus expects for latency histograms
+def observe(name, value, **labels):
+    key = _key(name, labels)
+    with _lock:
+        histogram = _histograms.get(key)
+        if histogram is None:
+            histogram = _histograms[key] = {"buckets": [0] * len(BUCKETS), "sum": 0.0, "count": 0}
+        for i, bound in enumerate(BUCKETS):
+            if value <= bound:
+                histogram["buckets"][i] += 1
+        histogram["sum"] += value
+        histogram["count"] += 1
+
+#this is stage timing: this times a block, records it in the stage histogram, and notes it for the current request's timing header, and this is why we do it like this so one `with timed(...)` line instruments any stage
+@contextmanager
+def timed(stage, **labels):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        observe('symbiosis_stage_seconds', elapsed, stage=stage, **labels)
+        timings = getattr(_local, 'timings', None)
+        if timings is not None:
+            timings.append((stage, elapsed))
+
+#this is request scoping: this starts and reads a per-thread list of stage timings, and this is why we do it like this so flask can attach a server-timing header showing where one request spent its time
+def begin_request():
+    _local.timings = []
+
+def request_timings():
+    timings = getattr(_local, 'timings', None) or []
+    _local.timings = None
+    return timings
+
+def _labels(pairs, extra=()):
+    pairs = list(pairs) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join('{}="{}"'.format(k, str(v).replace('\\', '\\\\').replace('"', '\\"')) for k, v in pairs) + "}"
+
+#this is exposition: this renders every counter and histogram in the prometheus text format, and this is why we do it like this so any prometheus server can scrape /metrics directly
+def render():
+    lines = []
+    with _lock:
+        counters = dict(_counters)
+        histograms = {k: {"buckets": list(v["buckets"]), "sum": v["sum"], "count": v["count"]} for k, v in _histograms.items()}
+
+    for name in sorted({k[0] for k in counters}):
+        if name in _help:
+            lines.append(f"# HELP {name} {_help[name]}")
+        lines.append(f"# TYPE {name} counter")
+        for (metric, labels), value in sorted(counters.items()):
+            if metric == name:
+                lines.append(f"{name}{_labels(labels)} {value}")
+
+    for name in sorted({k[0] for k in histograms}):
+        if name in _help:
+            lines.append(f"# HELP {name} {_help[name]}")
+        lines.append(f"# TYPE {name} histogram")
+        for (metric, labels), histogram in sorted(histograms.items()):
+            if metric != name:
+                continue
+            for bound, count in zip(BUCKETS, histogram["buckets"]):
+                lines.append(f"{name}_bucket{_labels(labels, [('le', bound)])} {count}")
+            lines.append(f"{name}_bucket{_labels(labels, [('le', '+Inf')])} {histogram['count']}")
+            lines.append(f"{name}_sum{_labels(labels)} {histogram['sum']}")
+            lines.append(f"{name}_count{_labels(labels)} {histogram['count']}")
+    return "\n".join(lines) + "\n"
+
+describe('symbiosis_stage_seconds', 'latency of internal stages (csv load, index build, upstream http, retrieval, llm, pdf extraction, graph edges).')
+describe('symbiosis_http_request_seconds', 'latency of flask requests by endpoint and status.')
+describe('symbiosis_cache_requests_total', 'cache lookups by cache and result.')
+describe('symbiosis_upstream_errors_total', 'failed upstream api calls by source.')
+describe('symbiosis_llm_tokens_total', 'llm tokens by direction as reported by the api.')
+describe('symbiosis_telemetry_missing_total', 'telemetry sources reported as null by source and reason (deadline or error).')
@@ -0,0 +1,134 @@
+#this is imports and class setup: this imports pandas and numpy to turn the policy csv into compact typed columns, and it sets up the policy store class, and this is why we do it like this so the hot paths work on integer codes, bitmasks and prebuilt indexes instead of scanning a generic dataframe of strings
+import json
+import hashlib
+import numpy as np
+import pandas as pd
+
+CATEGORICAL_FIELDS = ['country', 'category', 'type']
+TEXT_FIELDS = ['title', 'region', 'summary', 'plain_summary', 'official_url']
+
+class PolicyStore:
+    def __init__(self, df, tag_columns):
+        # edge case: a uint16 mask has room for sixteen tags, so a longer tag list would silently lose bits
+        if len(tag_columns) > 16:
+            raise ValueError("policy store supports at most 16 tag columns.")
+        self.tag_columns = list(tag_columns)
+        self.size = len(df)
+        self.ids = df['id'].astype(str).tolist() if 'id' in df else []
+
+        # edge case: missing text cells become empty strings (and missing urls None) so renderers never print 'nan'
+        self.text = {}
+        for field in TEXT_FIELDS:
+            column = df[field] if field in df else pd.Series([None] * self.size, dtype=object)
+            values = column.astype(object).where(column.notna(), None).tolist()
+            self.text[field] = values if field == 'official_url' else ["" if v is None else str(v) for v in values]
+
+        self.codes = {}
+        self.labels = {}
+        self.index = {}
+        for field in CATEGORICAL_FIELDS:
+            column = df[field].astype(object).where(df[field].notna(), None) if field in df else pd.Series([None] * self.size, dtype=object)
+            categorical = pd.Categorical(column.map(lambda v: None if v is None else str(v)))
+            self.codes[field] = categorical.codes.astype(np.int16 if len(categorical.categories) < 32767 else np.int32)
+            self.labels[field] = [str(c) for c in categorical.categories]
+            self.index[field] = self._group(self.codes[field], self.labels[field])
+
+        # edge case: unparseable or missing numbers are stored as -1 rather than forcing the whole column to float
+        self.years = self._int_column(df, 'year', np.int32)
+        self.effectiveness = self._int_column(df, 'effectiveness', np.int16)
+        self.index['year'] = {int(y): np.flatnonzero(self.years == y) for y in np.unique(self.years) if y >= 0}
+
+        self.tag_mask = np.zeros(self.size, dtype=np.uint16)
+        for bit, tag in enumerate(self.tag_columns):
+            if tag in df:
+                self.tag_mask |= ((df[tag] == 'Yes').to_numpy(dtype=bool).astype(np.uint16) << bit)
+
+    def __len__(self):
+        return self.size
+
+    @staticmethod
+    def _int_column(df, field, dtype):
+        if field not in df:
+            return np.full(len(df), -1, dtype=dtype)
+        return pd.to_numeric(df[field], errors='coerce').fillna(-1).astype(dtype).to_numpy()
+
+    #this is index building: this groups row positions by category code in one stable sort, and this is why we do it like this so "all policies in india" is a dictionary lookup rather than a string comparison over every row
+    @staticmethod
+    def _group(codes, labels):
+        order = np.argsort(codes, kind='stable')
+        bounds = np.searchsorted(codes[order], np.arange(len(labels) + 1))
+        return {label: order[bounds[i]:bounds[i + 1]] for i, label in enumerate(labels)}
+
+    #this is tag expansion: this unpacks the bitmask back into one boolean column per tag, and this is why we do it like this so edge building can still use a matrix product while storage stays at two bytes per policy
+    def tag_matrix(self, rows=None):
+        mask = self.tag_mask if rows is None else self.tag_mask[rows]
+        bits = np.uint16(1) << np.arange(len(self.tag_columns), dtype=np.uint16)
+        return (mask[:, None] & bits) != 0
+
+    def active_tags(self, i):
+        mask = int(self.tag_mask[i])
+        return [tag for bit, tag in enumerate(self.tag_columns) if mask >> bit & 1]
+
+    def positions(self, field, value):
+        return self.index.get(field, {}).get(value, np.array([], dtype=np.int64))
+
+    def values(self, field):
+        return sorted(self.index.get(field, {}))
+
+    def label(self, field, i):
+        code = self.codes[field][i]
+        return self.labels[field][code] if code >= 0 else ""
+
+    #this is row filtering: this intersects prebuilt index postings for country, category and type with year and tag masks, and this is why we do it like this so graph filters, telemetry events and retrieval pre-filters all share one cheap code path
+    def filter(self, rows=None, country=None, category=None, type=None, year_range=None, tags=None):
+        result = np.arange(self.size) if rows is None else np.asarray(rows, dtype=np.int64)
+        for field, value in (('country', country), ('category', category), ('type', type)):
+            if value:
+                result = result[np.isin(result, self.positions(field, value), assume_unique=True)]
+        if year_range:
+            low, high = year_range
+            years = self.years[result]
+            keep = years >= 0
+            if low is not None:
+                keep &= years >= low
+            if high is not None:
+                keep &= years <= high
+            result = result[keep]
+        if tags:
+            wanted = 0
+            for tag in tags:
+                if tag in self.tag_columns:
+                    wanted |= 1 << self.tag_columns.index(tag)
+            result = result[(self.tag_mask[result] & wanted) == wanted]
+        return result
+
+    #this is record access: this rebuilds a plain dict for one policy, and this is why we do it like this so renderers (tooltips, ai documents) read one row without touching pandas
+    def record(self, i):
+        record = {"id": self.ids[i]}
+        for field in TEXT_FIELDS:
+            record[field] = self.text[field][i]
+        for field in CATEGORICAL_FIELDS:
+            record[field] = self.label(field, i)
+        record["year"] = int(self.years[i]) if self.years[i] >= 0 else ""
+        record["effectiveness"] = int(self.effectiveness[i]) if self.effectiveness[i] >= 0 else ""
+        return record
+
+    def records(self):
+        return (self.record(i) for i in range(self.size))
+
+    #this is row fingerprinting: this hashes every policy's full record and tag mask under its id, and this is why we do it like this so a reload can tell added, edited and removed policies apart without comparing every field by hand
+    def fingerprints(self):
+        prints = {}
+        for i, record in enumerate(self.records()):
+            record["tags"] = int(self.tag_mask[i])
+            prints[record["id"]] = hashlib.sha1(json.dumps(record, sort_keys=True).encode('utf-8')).hexdigest()
+        return prints
+
+    #this is store diffing: this compares two stores' fingerprints by id, and this is why we do it like this so reloads can report exactly what changed and skip all work when nothing did
+    def diff(self, other):
+        old, new = self.fingerprints(), other.fingerprints()
+        return {
+            "added": sorted(set(new) - set(old)),
+            "removed": sorted(set(old) - set(new)),
+            "changed": sorted(i for i in set(old) & set(new) if old[i] != new[i])
+        }
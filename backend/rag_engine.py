@@ -1,88 +1,349 @@
 #this is imports and class setup: this imports langchain tools and openai embeddings, and it initializes the greenpt models, and this is why we do it like this to bundle all complex ai logic into one clean, reusable object
 import os
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, TimeoutError as FutureTimeout
 from langchain_community.vectorstores import FAISS
 from langchain_openai import ChatOpenAI, OpenAIEmbeddings
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.documents import Document
+from langchain_community.docstore.in_memory import InMemoryDocstore
+from backend.vector_cache import VectorIndexCache
+from backend.cache import AnswerCache
+from backend.hybrid_retriever import HybridRetriever
+from backend import metrics
+
+#this is text chunking: this cuts long text into overlapping windows and prefers to break on a paragraph or line boundary near the end of each window, and this is why we do it like this so a mechanism described across a page break still lands whole in at least one chunk
+def chunk_text(text, size, overlap):
+    text = text.strip()
+    chunks = []
+    start = 0
+    while start < len(text):
+        end = min(start + size, len(text))
+        if end < len(text):
+            # edge case: only snap back to a boundary in the last quarter of the window so chunks never shrink to slivers
+            cut = max(text.rfind("\n\n", start, end), text.rfind("\n", start, end))
+            if cut > start + size * 3 // 4:
+                end = cut
+        chunks.append(text[start:end].strip())
+        if end >= len(text):
+            break
+        start = max(end - overlap, start + 1)
+    return [c for c in chunks if c]
 
 class RagEngine:
-    def __init__(self, data_frame, tags):
+    def __init__(self, store):
         self.api_key = os.environ.get("greenpt_api_key")
-        self.base_url = "https://api.greenpt.ai/v1"
+        self.base_url = os.environ.get("greenpt_base_url", "https://api.greenpt.ai/v1")
         
         self.llm = ChatOpenAI(
             model="green-r-raw", 
             api_key=self.api_key, 
             base_url=self.base_url,
-            temperature=0
+            temperature=0,
+            # edge case: asks the api to attach token usage to the last streamed chunk so streamed answers are counted too
+            stream_usage=True
         )
         
+        # edge case: embedding_token_check=0 sends raw text instead of pre-tokenizing with tiktoken, whose encoding files are downloaded on first use and so break offline runs
         self.embeddings = OpenAIEmbeddings(
             model="green-embeddings", 
             api_key=self.api_key, 
-            base_url=self.base_url
+            base_url=self.base_url,
+            check_embedding_ctx_length=str(os.environ.get("embedding_token_check", "1")).lower() not in ("0", "false", "no")
+        )
+        
+        self.vector_cache = VectorIndexCache(os.environ.get('vector_cache_dir', 'data/vector_index'), self.embeddings.model)
+        
+        # edge case: answer_cache_similarity=0 turns off the semantic tier and keeps exact matches only
+        self.answer_cache = AnswerCache(
+            max_size=int(os.environ.get('answer_cache_size', 256)),
+            ttl=int(os.environ.get('answer_cache_ttl', 3600)),
+            similarity=float(os.environ.get('answer_cache_similarity', 0.97))
         )
+        # edge case: sizes are in characters and the token budget uses the rough four-characters-per-token rule, so no tokenizer download is needed
+        self.pdf_chunk_chars = int(os.environ.get('pdf_chunk_chars', 3000))
+        self.pdf_chunk_overlap = int(os.environ.get('pdf_chunk_overlap', 300))
+        self.pdf_token_budget = int(os.environ.get('pdf_token_budget', 24000))
+        self.pdf_deadline = float(os.environ.get('pdf_deadline', 90))
+        self.pdf_chunk_k = int(os.environ.get('pdf_chunk_k', 5))
+        self.map_pool = ThreadPoolExecutor(max_workers=int(os.environ.get('pdf_map_workers', 4)), thread_name_prefix='pdf-map')
+        # edge case: deadline-bound calls get their own pool so map tasks stuck past their deadline can't queue the embedding or reduce call behind them
+        self.call_pool = ThreadPoolExecutor(max_workers=int(os.environ.get('pdf_map_workers', 4)), thread_name_prefix='pdf-call')
+        
+        # edge case: a smaller, filtered k keeps prompts short; keyword-like queries of up to retrieval_lexical_terms words skip the embedding call
+        self.retrieval_k = int(os.environ.get('retrieval_k', 8))
+        self.lexical_max_terms = int(os.environ.get('retrieval_lexical_terms', 4))
         
-        self.retriever = self._build_vector_store(data_frame, tags)
+        # edge case: the store, retriever and faiss wrapper live in one dict swapped in a single assignment, so a query never filters by new row positions against an old index
+        self.update_lock = threading.Lock()
+        self.snapshot = self._build_vector_store(store)
         
         self.prompt = ChatPromptTemplate.from_messages([
             ("system", "you are an expert environmental policy analyst. use the provided context to answer. context: {context}"),
             ("human", "{input}"),
         ])
 
-    #this is database creation: this iterates through policies and bundles them into text documents for the ai to read, and it creates a faiss index, and this is why we do it like this to allow the ai to rapidly search thousands of policies using vector similarity
-    def _build_vector_store(self, df, tags):
+    @property
+    def store(self):
+        return self.snapshot["store"]
+
+    @property
+    def retriever(self):
+        return self.snapshot["retriever"]
+
+    @property
+    def vector_store(self):
+        return self.snapshot["vector_store"]
+
+    #this is document rendering: this turns one policy record into the text block the ai reads, and this is why we do it like this so the vector cache can hash exactly the text that gets embedded
+    def _render_document(self, row, active_tags):
+        return (
+            f"policy title: {row['title']}\n"
+            f"location: {row['region']}, {row['country']} ({row['year']})\n"
+            f"category: {row['category']} | type: {row['type']}\n"
+            f"summary: {row['summary']}\n"
+            f"tags: {', '.join(active_tags)}\n"
+            f"effectiveness score: {row['effectiveness']}/100"
+        )
+
+    #this is database creation: this bundles policies into text documents, syncs them against the persisted faiss index so only new or edited rows get embedded, and returns the store, retriever and faiss wrapper as one snapshot without publishing it, and this is why we do it like this so restarts and extra workers load vectors from disk instead of re-embedding thousands of policies, and a rebuild never touches the live snapshot
+    def _build_vector_store(self, store):
         print("building greenpt vector database...")
         documents = []
         
-        for _, row in df.iterrows():
-            active_tags = [tag for tag in tags if row.get(tag) == 'Yes']
-            
-            content = (
-                f"policy title: {row['title']}\n"
-                f"location: {row.get('region', '')}, {row['country']} ({row['year']})\n"
-                f"category: {row['category']} | type: {row['type']}\n"
-                f"summary: {row['summary']}\n"
-                f"tags: {', '.join(active_tags)}\n"
-                f"effectiveness score: {row['effectiveness']}/100"
-            )
-            
-            documents.append(Document(page_content=content, metadata={"id": row['id']}))
+        for i, row in enumerate(store.records()):
+            documents.append(Document(page_content=self._render_document(row, store.active_tags(i)), metadata={"id": row['id']}))
 
         # edge case: only try to run faiss if documents array actually has items in it
         if documents:
-            vector_store = FAISS.from_documents(documents, self.embeddings)
-            return vector_store.as_retriever(search_kwargs={"k": 15})
+            with metrics.timed('index_build', index='vector'):
+                index, embedded = self.vector_cache.sync([d.page_content for d in documents], self.embeddings.embed_documents)
+            print(f"vector database ready: {len(documents)} documents, {embedded} newly embedded.")
+            
+            # edge case: positional docstore keys keep duplicate policy ids from overwriting each other
+            vector_store = FAISS(
+                embedding_function=self.embeddings,
+                index=index,
+                docstore=InMemoryDocstore({str(i): d for i, d in enumerate(documents)}),
+                index_to_docstore_id={i: str(i) for i in range(len(documents))}
+            )
+            retriever = HybridRetriever(documents, index, lexical_max_terms=self.lexical_max_terms, fetch_k=max(40, self.retrieval_k * 4))
+            return {"store": store, "retriever": retriever, "vector_store": vector_store}
         else:
             print("warning: no documents found. ai will not have context.")
+            return {"store": store, "retriever": None, "vector_store": None}
+
+    #this is incremental store update: this re-syncs the vector index against a reloaded policy store off to the side, which only embeds rows whose rendered text is new, and then publishes the new snapshot in one assignment, and this is why we do it like this so a csv edit costs a few embedding calls instead of a restart, and queries keep using the complete old snapshot while the new one builds
+    def update_store(self, store):
+        # edge case: overlapping updates (a watch reload racing the startup catch-up) are applied one at a time
+        with self.update_lock:
+            self.snapshot = self._build_vector_store(store)
+        # edge case: cached answers were grounded in the old documents, so they go once the new store is live
+        self.answer_cache.invalidate()
+
+    #this is metadata pre-filtering: this turns country, category, type, year range and tag filters into the allowed row positions, and this is why we do it like this so country briefs only retrieve that country's policies
+    def _allowed_rows(self, store, filters):
+        if not filters:
             return None
+        rows = store.filter(
+            country=filters.get('country'),
+            category=filters.get('category'),
+            type=filters.get('type'),
+            year_range=filters.get('year_range'),
+            tags=filters.get('tags')
+        )
+        # edge case: a filter that matches nothing (e.g. a country with no policies yet) falls back to the whole corpus instead of an empty context
+        return rows if len(rows) else None
 
-    #this is ai query execution: this runs a user search against the faiss database to find context, and it passes both the context and query to the llm, and this is why we do it like this to prevent ai hallucinations by grounding answers in our own csv data
-    def ask(self, query):
-        # edge case: fallback string if the database never built successfully
-        if not self.retriever:
-            return "i have no data to answer that.", []
-        docs = self.retriever.invoke(query)
+    #this is retrieval with caching: this checks the answer cache and runs the hybrid search against one snapshot, embedding the query at most once and not at all for keyword-like queries, and this is why we do it like this so both the blocking and streaming paths share one cache-aware retrieval step
+    def _retrieve(self, snapshot, query, filters=None):
+        retriever = snapshot["retriever"]
+        allowed = self._allowed_rows(snapshot["store"], filters)
+        embedding = None
+        
+        # edge case: the semantic tier ignores filters, so filtered queries (e.g. per-country briefs from one template) only use the exact tier
+        if not retriever.is_keyword_query(query) and allowed is None:
+            with metrics.timed('embed_query'):
+                embedding = self.embeddings.embed_query(query)
+            cached = self.answer_cache.get_similar(embedding)
+            if cached:
+                return embedding, cached[1], None, cached[0]
+        
+        with metrics.timed('retrieval'):
+            docs, used_embedding = retriever.search(
+                query, self.retrieval_k,
+                lambda q: embedding if embedding is not None else self.embeddings.embed_query(q),
+                allowed
+            )
+        # edge case: filtered answers never enter the semantic tier, so an unfiltered look-alike question can't pick up a country-scoped answer
+        if embedding is None and allowed is None:
+            embedding = used_embedding
         sources = [d.metadata['id'] for d in docs]
+        
+        cached = self.answer_cache.get_exact(query, sources)
+        if cached:
+            return embedding, sources, None, cached[0]
+        
         context = "\n\n".join([d.page_content for d in docs])
+        return embedding, sources, context, None
+
+    #this is ai query execution: this retrieves context (or a cached answer) and passes both the context and query to the llm, and this is why we do it like this to prevent ai hallucinations by grounding answers in our own csv data while skipping the llm for questions we've just answered
+    def ask(self, query, filters=None):
+        # edge case: the cache generation is read before the snapshot, because update_store swaps the snapshot before it invalidates
+        generation = self.answer_cache.generation
+        snapshot = self.snapshot
+        # edge case: fallback string if the database never built successfully
+        if not snapshot["retriever"]:
+            return "i have no data to answer that.", []
+        
+        embedding, sources, context, cached = self._retrieve(snapshot, query, filters)
+        if cached is not None:
+            return cached, sources
         
-        response = self.llm.invoke(self.prompt.format_messages(context=context, input=query))
+        answer = self._invoke(self.prompt.format_messages(context=context, input=query))
+        self.answer_cache.put(query, sources, answer, embedding, generation)
         
-        return str(response.content), sources
+        return answer, sources
 
-    #this is pdf policy analysis: this takes raw text from an uploaded document and searches the vector database for similar historical laws, and it formats a strict comparison prompt, and this is why we do it like this to turn static data into an active policy workshopping tool
-    def analyze_pdf(self, pdf_text):
-        # edge case: abort if database is offline
-        if not self.retriever:
-            return "system offline.", []
-            
-        # edge case: grab only the first 2000 characters for the search query to avoid blowing up the embedding token limit
-        search_query = "find environmental policies similar to these mechanisms: " + pdf_text[:2000]
+    #this is token accounting: this adds the input and output token counts the api reported to the metrics registry, and this is why we do it like this so spend can be tracked next to latency
+    def _count_tokens(self, message):
+        usage = getattr(message, 'usage_metadata', None) or {}
+        for kind in ('input_tokens', 'output_tokens'):
+            if usage.get(kind):
+                metrics.inc('symbiosis_llm_tokens_total', usage[kind], direction=kind.split('_')[0])
+
+    #this is timed llm call: this runs one blocking llm call under the llm stage timer and counts its tokens, and this is why we do it like this so every blocking call site is measured the same way
+    def _invoke(self, messages, stage='llm'):
+        with metrics.timed(stage):
+            response = self.llm.invoke(messages)
+        self._count_tokens(response)
+        return str(response.content)
+
+    #this is deadline-bound calls: this runs one blocking call on the call pool and waits for it only until the deadline, and this is why we do it like this so a slow embedding or llm call (including the client's own retries) can't hold an upload past pdf_deadline
+    def _before(self, deadline, step, fn, *args):
+        future = self.call_pool.submit(fn, *args)
+        try:
+            return future.result(timeout=max(0.0, deadline - time.monotonic()))
+        except FutureTimeout:
+            # edge case: the abandoned call finishes in the background and its result is dropped
+            raise TimeoutError(f"pdf analysis exceeded {self.pdf_deadline:g} seconds while {step}.")
+
+    #this is token streaming: this forwards llm chunks as they arrive and times the first token and the whole generation, and this is why we do it like this so every streaming endpoint emits the same {"token": ...} events and time-to-first-token shows up next to total llm time
+    def _stream_tokens(self, messages, **kwargs):
+        started = time.perf_counter()
+        first = True
+        try:
+            for chunk in self.llm.stream(messages, **kwargs):
+                self._count_tokens(chunk)
+                # edge case: some chunks only carry metadata and have no text to forward
+                if chunk.content:
+                    if first:
+                        metrics.observe('symbiosis_stage_seconds', time.perf_counter() - started, stage='llm_first_token')
+                        first = False
+                    yield str(chunk.content)
+        finally:
+            metrics.observe('symbiosis_stage_seconds', time.perf_counter() - started, stage='llm_stream')
+
+    #this is streaming query execution: this yields the retrieved source ids first and then llm tokens as they arrive, and this is why we do it like this so time-to-first-byte is the retrieval time rather than the full generation time
+    def ask_stream(self, query, filters=None):
+        # edge case: the cache generation is read before the snapshot, because update_store swaps the snapshot before it invalidates
+        generation = self.answer_cache.generation
+        snapshot = self.snapshot
+        if not snapshot["retriever"]:
+            yield {"sources": []}
+            yield {"token": "i have no data to answer that."}
+            return
+        
+        embedding, sources, context, cached = self._retrieve(snapshot, query, filters)
+        yield {"sources": sources}
+        if cached is not None:
+            yield {"token": cached}
+            return
+        
+        parts = []
+        for token in self._stream_tokens(self.prompt.format_messages(context=context, input=query)):
+            parts.append(token)
+            yield {"token": token}
+        # edge case: only a fully streamed answer is cached, so a client disconnect mid-stream never stores a truncated reply
+        self.answer_cache.put(query, sources, "".join(parts), embedding, generation)
+
+    #this is budget selection: this keeps every chunk if they fit the token budget and otherwise keeps an evenly spaced subset, and this is why we do it like this so a huge upload is sampled across its whole length rather than cut off after the preamble
+    def _select_chunks(self, chunks):
+        budget_chars = self.pdf_token_budget * 4
+        total = sum(len(c) for c in chunks)
+        if total <= budget_chars:
+            return chunks
+        keep = max(1, budget_chars // max(1, total // len(chunks)))
+        step = len(chunks) / keep
+        return [chunks[int(i * step)] for i in range(keep)]
+
+    #this is per-chunk retrieval: this embeds every chunk in one batched call, searches faiss per chunk, and merges hits for the same policy by summing their similarity, and this is why we do it like this so policies that match many sections of the draft outrank one lucky match
+    def _retrieve_for_chunks(self, vector_store, chunks, deadline):
+        with metrics.timed('embed_chunks'):
+            vectors = self._before(deadline, "embedding the draft", self.embeddings.embed_documents, chunks)
+        k = self.retrieval_k
+        scores, docs = {}, {}
+        
+        # edge case: short documents with only a chunk or two still pull a full k of candidates between them
+        per_chunk = max(self.pdf_chunk_k, -(-k // max(1, len(vectors))))
+        
+        for vector in vectors:
+            for doc, distance in vector_store.similarity_search_with_score_by_vector(vector, k=per_chunk):
+                policy_id = doc.metadata['id']
+                # edge case: faiss returns l2 distances, so they are turned into a bounded similarity before summing
+                scores[policy_id] = scores.get(policy_id, 0.0) + 1.0 / (1.0 + float(distance))
+                docs[policy_id] = doc
+        
+        ranked = sorted(scores, key=scores.get, reverse=True)[:k]
+        return [docs[policy_id] for policy_id in ranked]
+
+    #this is section summarization: this asks the llm for a short bullet summary of one chunk, and this is why we do it like this so the final prompt sees every section of the draft in compressed form
+    def _summarize_chunk(self, index, total, chunk):
+        return self._invoke(self.prompt.format_messages(
+            context="",
+            input=(
+                f"this is section {index + 1} of {total} of a draft environmental policy. "
+                "summarize its concrete policy mechanisms, targets and obligations in at most 5 short bullets.\n\n"
+                f"{chunk}"
+            )
+        ), stage='llm_map')
+
+    #this is the map phase: this summarizes the selected chunks concurrently on a bounded pool and stops waiting at the deadline, and this is why we do it like this so long uploads stay responsive and a slow section is dropped instead of stalling the whole analysis
+    def _map_sections(self, chunks, deadline):
+        futures = [self.map_pool.submit(self._summarize_chunk, i, len(chunks), c) for i, c in enumerate(chunks)]
+        wait(futures, timeout=max(0.0, deadline - time.monotonic()))
+        
+        summaries = []
+        for i, future in enumerate(futures):
+            # edge case: sections that haven't started are cancelled and sections that failed are skipped, with a marker so the reduce step knows
+            if future.done() and not future.cancelled() and not future.exception():
+                summaries.append(f"section {i + 1}:\n{future.result()}")
+            else:
+                future.cancel()
+                summaries.append(f"section {i + 1}: (not summarized in time)")
+        return summaries
+
+    #this is pdf prompt building: this chunks the uploaded text, retrieves similar historical laws for every chunk, summarizes the sections in parallel when there is more than one, and formats a strict comparison prompt over the result, and this is why we do it like this to turn static data into an active policy workshopping tool that reads the whole document
+    def _pdf_messages(self, vector_store, pdf_text, deadline):
+        # edge case: the map phase ends two thirds of the way to the deadline so the reduce call still has time to run
+        map_deadline = deadline - self.pdf_deadline / 3
+        chunks = chunk_text(pdf_text, self.pdf_chunk_chars, self.pdf_chunk_overlap)
+        selected = self._select_chunks(chunks)
         
-        docs = self.retriever.invoke(search_query)
+        with metrics.timed('retrieval_pdf'):
+            docs = self._retrieve_for_chunks(vector_store, selected, map_deadline)
         sources = [d.metadata['id'] for d in docs]
         context = "\n\n".join([d.page_content for d in docs])
         
+        # edge case: a short document fits in one chunk and goes to the reduce prompt verbatim, skipping the extra llm round trip
+        if len(selected) == 1:
+            draft_text = selected[0]
+        else:
+            draft_text = "\n\n".join(self._map_sections(selected, map_deadline))
+            if len(selected) < len(chunks):
+                draft_text = f"(sampled {len(selected)} of {len(chunks)} sections to fit the token budget)\n\n" + draft_text
+        
         prompt_template = (
             "you are an expert policy analyst. i am providing you with the text of a draft policy "
             "and a context of existing global environmental policies.\n\n"
@@ -97,12 +358,34 @@ class RagEngine:
             "recommendations on how to improve the draft based on the historical successes or failures of the matched policy."
         )
         
-        # edge case: truncate full pdf text to 4000 characters to ensure the llm context window doesn't overflow
-        safe_pdf_text = pdf_text[:4000]
-        
-        response = self.llm.invoke(self.prompt.format_messages(
+        messages = self.prompt.format_messages(
             context=context, 
-            input=prompt_template.format(pdf_text=safe_pdf_text, context=context)
-        ))
+            input=prompt_template.format(pdf_text=draft_text, context=context)
+        )
+        return messages, sources
+
+    #this is pdf policy analysis: this runs the comparison prompt through the llm in one blocking call, and this is why we do it like this for callers that want the whole analysis as a single json blob
+    def analyze_pdf(self, pdf_text):
+        snapshot = self.snapshot
+        # edge case: abort if database is offline
+        if not snapshot["retriever"]:
+            return "system offline.", []
+        
+        deadline = time.monotonic() + self.pdf_deadline
+        messages, sources = self._pdf_messages(snapshot["vector_store"], pdf_text, deadline)
+        return self._before(deadline, "writing the analysis", self._invoke, messages), sources
+
+    #this is streaming pdf analysis: this yields the matched source ids and then the analysis tokens as the llm produces them, and this is why we do it like this so the analyzer tab starts rendering while the model is still writing
+    def analyze_pdf_stream(self, pdf_text):
+        snapshot = self.snapshot
+        if not snapshot["retriever"]:
+            yield {"sources": []}
+            yield {"token": "system offline."}
+            return
         
-        return str(response.content), sources
\ No newline at end of file
+        deadline = time.monotonic() + self.pdf_deadline
+        messages, sources = self._pdf_messages(snapshot["vector_store"], pdf_text, deadline)
+        yield {"sources": sources}
+        # edge case: a streamed reply can't be abandoned mid-way, so the remaining time becomes the request timeout, which bounds the wait for each chunk
+        for token in self._stream_tokens(messages, timeout=max(1.0, deadline - time.monotonic())):
+            yield {"token": token}
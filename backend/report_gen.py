@@ -5,10 +5,10 @@ class ReportGenerator:
         self.data_manager = data_manager
         self.rag_engine = rag_engine
 
-    #this is report generation: this pulls specific telemetry strings for a country and 
-    # injects them into a strict markdown prompt, and it queries the ai, 
+    #this is prompt building: this pulls specific telemetry strings for a country and 
+    # injects them into a strict markdown prompt, 
     # and this forces the llm into producing a highly structured professional briefing
-    def generate_brief(self, country):
+    def _build_prompt(self, country):
         telemetry = self.data_manager.get_telemetry(country)
         metrics = telemetry.get('metrics', {})
         
@@ -37,10 +37,21 @@ class ReportGenerator:
             "## strategic recommendations\n\n"
             "be concise, highly professional, and cite specific environmental policies from your database."
         )
+        return prompt
+
+    #this is retrieval scoping: this limits the brief's context to the country's own policies, 
+    # and this is why we do it like this so the prompt isn't padded with unrelated countries' laws
+    def _filters(self, country):
+        return {"country": self.data_manager.policy_country(country)}
+
+    #this is report generation: this builds the brief prompt and queries the ai in one blocking call, 
+    # and this is why we do it like this for callers that want the finished report as one json blob
+    def generate_brief(self, country):
+        prompt = self._build_prompt(country)
 
         # edge case: bypass the query entirely and return an error block if ai engine is down
         if self.rag_engine:
-            report_content, sources = self.rag_engine.ask(prompt)
+            report_content, sources = self.rag_engine.ask(prompt, self._filters(country))
         else:
             report_content = "# error\nthe ai engine is offline. cannot generate report."
             sources = []
@@ -49,4 +60,19 @@ class ReportGenerator:
             "country": country,
             "report_md": report_content,
             "sources": sources
-        }
\ No newline at end of file
+        }
+
+    #this is streaming report generation: this yields the country and source ids first and then the brief as the llm writes it, 
+    # and this is why we do it like this so the chat window shows the report growing instead of a spinner
+    def generate_brief_stream(self, country):
+        # edge case: the country goes out before the prompt is built, because building it waits on telemetry for up to telemetry_deadline
+        yield {"country": country}
+        
+        # edge case: stream the same offline message as the blocking path when the ai engine is down
+        if not self.rag_engine:
+            yield {"sources": []}
+            yield {"token": "# error\nthe ai engine is offline. cannot generate report."}
+            return
+        
+        prompt = self._build_prompt(country)
+        yield from self.rag_engine.ask_stream(prompt, self._filters(country))
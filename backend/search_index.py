@@ -0,0 +1,91 @@
+#this is imports and class setup: this imports regex and bisect for tokenizing and prefix lookups, and it sets up the search index class, and this is why we do it like this so keyword search is resolved against posting lists built once instead of rescanning the dataframe on every request
+import re
+from bisect import bisect_left
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+class SearchIndex:
+    def __init__(self, fields):
+        self.fields = list(fields)
+        self.postings = {field: {} for field in self.fields}
+        self.vocab = {field: [] for field in self.fields}
+        self.size = 0
+
+    #this is tokenization: this lowercases text and splits it on anything that isn't a letter or digit, and this is why we do it like this so 'carbon-pricing', 'carbon_pricing' and 'Carbon Pricing' all land on the same tokens
+    @staticmethod
+    def tokenize(text):
+        # edge case: pandas hands us nan floats for empty cells, which must not become the token 'nan'
+        if text is None or text != text:
+            return []
+        return TOKEN_PATTERN.findall(str(text).lower())
+
+    #this is index building: this walks every record once and appends its row position to the posting list of each token per field, and it sorts the vocabulary for prefix lookups, and this is why we do it like this so all the string work happens at load time
+    def build(self, records):
+        self.postings = {field: {} for field in self.fields}
+        self.size = 0
+
+        for position, record in enumerate(records):
+            for field in self.fields:
+                field_postings = self.postings[field]
+                for token in set(self.tokenize(record.get(field))):
+                    field_postings.setdefault(token, []).append(position)
+            self.size = position + 1
+
+        self.vocab = {field: sorted(self.postings[field]) for field in self.fields}
+        return self
+
+    #this is prefix expansion: this binary searches the sorted vocabulary for every token starting with the term and unions their postings, and this is why we do it like this so partially typed words still match without a linear scan over the vocabulary
+    def _match_term(self, term, fields):
+        matches = set()
+        for field in fields:
+            vocab = self.vocab[field]
+            field_postings = self.postings[field]
+            i = bisect_left(vocab, term)
+            while i < len(vocab) and vocab[i].startswith(term):
+                matches.update(field_postings[vocab[i]])
+                i += 1
+        return matches
+
+    #this is query parsing: this splits the query into terms and honours optional 'field:term' scoping, and this is why we do it like this so users can narrow a search to e.g. country:india without a separate api
+    def _parse(self, query):
+        terms = []
+        for part in str(query).lower().split():
+            field, sep, value = part.partition(':')
+            # edge case: unknown prefixes like 'http:' are treated as plain text instead of silently matching nothing
+            fields = [field] if sep and field in self.postings else self.fields
+            text = value if sep and field in self.postings else part
+            for token in self.tokenize(text):
+                terms.append((token, fields))
+        return terms
+
+    #this is search execution: this intersects the posting sets of every query term, smallest first, and returns matching row positions in corpus order, and this is why we do it like this so filtering cost depends on the matches rather than the corpus size
+    def search(self, query):
+        terms = self._parse(query)
+        # edge case: a query of only punctuation has no terms, so nothing is filtered out
+        if not terms:
+            return list(range(self.size))
+
+        candidate_sets = sorted((self._match_term(token, fields) for token, fields in terms), key=len)
+        result = candidate_sets[0]
+        for candidates in candidate_sets[1:]:
+            if not result:
+                break
+            result = result & candidates
+        return sorted(result)
+
+    #this is type-ahead suggestion: this returns the most common vocabulary words starting with the typed prefix, and this is why we do it like this so the network map search box can autocomplete from the same index without touching the dataframe
+    def suggest(self, prefix, limit=10):
+        terms = self.tokenize(prefix)
+        # edge case: empty or punctuation-only input has nothing to complete
+        if not terms:
+            return []
+        term = terms[-1]
+
+        counts = {}
+        for field in self.fields:
+            vocab = self.vocab[field]
+            i = bisect_left(vocab, term)
+            while i < len(vocab) and vocab[i].startswith(term):
+                counts[vocab[i]] = counts.get(vocab[i], 0) + len(self.postings[field][vocab[i]])
+                i += 1
+        return [token for token, _ in sorted(counts.items(), key=lambda item: (-item[1], item[0]))[:limit]]
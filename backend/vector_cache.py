@@ -0,0 +1,103 @@
+#this is imports and class setup: this imports faiss, numpy and the hashing helpers, and it sets up the on-disk vector cache, and this is why we do it like this so every worker on a host reuses one persisted index instead of re-embedding the whole corpus at boot
+import os
+import json
+import hashlib
+import numpy as np
+import faiss
+
+try:
+    import fcntl
+except ImportError:
+    # edge case: windows has no fcntl, so cross-process locking is skipped and the atomic renames alone keep files consistent
+    fcntl = None
+
+class VectorIndexCache:
+    def __init__(self, directory, model_name):
+        self.directory = directory
+        self.model_name = model_name
+        self.index_path = os.path.join(directory, 'index.faiss')
+        self.manifest_path = os.path.join(directory, 'manifest.json')
+        self.lock_path = os.path.join(directory, '.lock')
+
+    #this is content hashing: this fingerprints the exact rendered document text, and this is why we do it like this so a vector is reused only when the text it was embedded from is byte-for-byte the same
+    @staticmethod
+    def content_hash(text):
+        return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+    #this is file locking: this takes a shared or exclusive flock on a sidecar file, and this is why we do it like this so the first gunicorn worker embeds while the others wait and then read its result
+    def _lock(self, exclusive):
+        os.makedirs(self.directory, exist_ok=True)
+        handle = open(self.lock_path, 'a')
+        if fcntl:
+            fcntl.flock(handle, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        return handle
+
+    #this is cache loading: this reads the manifest and memory-maps the faiss file read-only, and this is why we do it like this so cold start costs a file open rather than pulling every vector into private memory
+    def load(self):
+        try:
+            with open(self.manifest_path) as f:
+                manifest = json.load(f)
+            if manifest.get('model') != self.model_name:
+                # edge case: vectors from a different embedding model live in a different space and can't be mixed
+                return None, []
+            try:
+                index = faiss.read_index(self.index_path, faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY)
+            except RuntimeError:
+                index = faiss.read_index(self.index_path)
+            hashes = manifest.get('hashes', [])
+            # edge case: a half-written pair of files (e.g. a crash between renames) is treated as no cache at all
+            if index.ntotal != len(hashes):
+                return None, []
+            return index, hashes
+        except (FileNotFoundError, ValueError, RuntimeError) as e:
+            if not isinstance(e, FileNotFoundError):
+                print(f"vector cache unreadable, rebuilding: {e}")
+            return None, []
+
+    #this is cache saving: this writes the index and manifest to temp files and renames them into place, and this is why we do it like this so readers never see a partially written index
+    def _save(self, index, hashes):
+        tmp_index = self.index_path + '.tmp'
+        tmp_manifest = self.manifest_path + '.tmp'
+        faiss.write_index(index, tmp_index)
+        with open(tmp_manifest, 'w') as f:
+            json.dump({"model": self.model_name, "dim": index.d, "hashes": hashes}, f)
+        os.replace(tmp_index, self.index_path)
+        os.replace(tmp_manifest, self.manifest_path)
+
+    #this is incremental sync: this lines the cached vectors up against the current documents by content hash, embeds only the new or edited texts, and persists the result, and this is why we do it like this so restarts and small corpus edits cost a handful of embedding calls instead of all of them
+    def sync(self, texts, embed_fn):
+        hashes = [self.content_hash(t) for t in texts]
+
+        handle = self._lock(exclusive=False)
+        try:
+            index, cached_hashes = self.load()
+        finally:
+            handle.close()
+        if index is not None and cached_hashes == hashes:
+            return index, 0
+
+        handle = self._lock(exclusive=True)
+        try:
+            # edge case: another worker may have finished the same sync while we waited for the exclusive lock
+            index, cached_hashes = self.load()
+            if index is not None and cached_hashes == hashes:
+                return index, 0
+
+            known = {}
+            if index is not None and cached_hashes:
+                vectors = index.reconstruct_n(0, index.ntotal)
+                known = {h: vectors[i] for i, h in enumerate(cached_hashes)}
+
+            missing = list(dict.fromkeys(h for h in hashes if h not in known))
+            if missing:
+                text_by_hash = dict(zip(hashes, texts))
+                embedded = np.asarray(embed_fn([text_by_hash[h] for h in missing]), dtype=np.float32)
+                known.update(zip(missing, embedded))
+
+            matrix = np.vstack([known[h] for h in hashes]).astype(np.float32)
+            fresh = faiss.IndexFlatL2(matrix.shape[1])
+            fresh.add(matrix)
+            self._save(fresh, hashes)
+            return fresh, len(missing)
+        finally:
+            handle.close()
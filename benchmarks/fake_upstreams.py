@@ -0,0 +1,170 @@
+#this is imports and setup: this imports the standard library http server to stand in for greenpt, the world bank and openaq on localhost, and this is why we do it like this so benchmarks run offline, without api keys, and with a latency we choose instead of whatever the internet gives us that day
+import json
+import time
+import zlib
+import hashlib
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlsplit, parse_qs
+import numpy as np
+
+class FakeUpstreams:
+    def __init__(self, api_latency=0.05, llm_latency=0.2, token_latency=0.005, answer_tokens=60, embedding_dim=64, host='127.0.0.1', port=0):
+        self.api_latency = api_latency
+        self.llm_latency = llm_latency
+        self.token_latency = token_latency
+        self.answer_tokens = answer_tokens
+        self.embedding_dim = embedding_dim
+        self.requests = {}
+        self.lock = threading.Lock()
+        self.server = ThreadingHTTPServer((host, port), self._handler())
+        self.server.daemon_threads = True
+        self.thread = None
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self.thread = threading.Thread(target=self.server.serve_forever, name='fake-upstreams', daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def count(self, route):
+        with self.lock:
+            self.requests[route] = self.requests.get(route, 0) + 1
+
+    #this is fake embedding: this turns each text into a deterministic unit vector seeded from its hash, and this is why we do it like this so identical texts always embed identically (the vector cache and answer cache behave as in production) without running a model
+    def embed(self, text):
+        seed = int.from_bytes(hashlib.sha1(text.encode('utf-8')).digest()[:4], 'little')
+        vector = np.random.default_rng(seed).standard_normal(self.embedding_dim).astype(np.float32)
+        return (vector / np.linalg.norm(vector)).tolist()
+
+    #this is fake world bank series: this returns one stable pseudo-random value per country, indicator and year, and this is why we do it like this so repeated runs chart the same numbers and results stay comparable
+    @staticmethod
+    def indicator_value(code, indicator, year):
+        return round((zlib.crc32(f"{code}:{indicator}:{year}".encode()) % 10000) / 100, 2)
+
+    def _handler(self):
+        upstreams = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            # edge case: the default handler logs every request to stderr, which would swamp the benchmark report
+            def log_message(self, *args):
+                pass
+
+            def _json(self, payload, status=200):
+                body = json.dumps(payload).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _body(self):
+                length = int(self.headers.get('Content-Length') or 0)
+                return json.loads(self.rfile.read(length) or b'{}')
+
+            def do_GET(self):
+                parts = urlsplit(self.path)
+                query = parse_qs(parts.query)
+                segments = [s for s in parts.path.split('/') if s]
+                time.sleep(upstreams.api_latency)
+
+                # edge case: mirrors /v2/country/<codes>/indicator/<indicator>, where codes may be semicolon-joined for bulk calls
+                if len(segments) == 5 and segments[0] == 'v2' and segments[1] == 'country' and segments[3] == 'indicator':
+                    upstreams.count('worldbank')
+                    return self._json(self._worldbank(segments[2].split(';'), segments[4], query))
+                if segments == ['v2', 'latest']:
+                    upstreams.count('openaq')
+                    return self._json(self._openaq(query))
+                self._json({"error": "not found"}, 404)
+
+            def _worldbank(self, codes, indicator, query):
+                this_year = time.localtime().tm_year
+                if 'date' in query:
+                    low, high = (int(y) for y in query['date'][0].split(':'))
+                else:
+                    low, high = this_year - int(query.get('per_page', ['60'])[0]) + 1, this_year
+                rows = [
+                    {
+                        "indicator": {"id": indicator},
+                        "country": {"id": code},
+                        "countryiso3code": code,
+                        "date": str(year),
+                        # edge case: the latest two years are null, as they usually are in the real api
+                        "value": None if year > this_year - 2 else FakeUpstreams.indicator_value(code, indicator, year)
+                    }
+                    for code in codes for year in range(high, low - 1, -1)
+                ]
+                per_page = int(query.get('per_page', ['50'])[0])
+                page = int(query.get('page', ['1'])[0])
+                pages = max(1, -(-len(rows) // per_page))
+                meta = {"page": page, "pages": pages, "per_page": per_page, "total": len(rows)}
+                return [meta, rows[(page - 1) * per_page:page * per_page]]
+
+            def _openaq(self, query):
+                code = query.get('country', [''])[0]
+                return {"results": [
+                    {"location": f"{code}-{i}", "measurements": [{"parameter": "pm25", "value": FakeUpstreams.indicator_value(code, 'pm25', i)}]}
+                    for i in range(5)
+                ]}
+
+            def do_POST(self):
+                path = urlsplit(self.path).path.rstrip('/')
+                payload = self._body()
+                if path.endswith('/embeddings'):
+                    upstreams.count('embeddings')
+                    time.sleep(upstreams.api_latency)
+                    texts = payload.get('input') or []
+                    texts = [texts] if isinstance(texts, str) else texts
+                    return self._json({
+                        "object": "list",
+                        "model": payload.get('model'),
+                        "data": [{"object": "embedding", "index": i, "embedding": upstreams.embed(str(t))} for i, t in enumerate(texts)],
+                        "usage": {"prompt_tokens": sum(len(str(t)) // 4 for t in texts), "total_tokens": sum(len(str(t)) // 4 for t in texts)}
+                    })
+                if path.endswith('/chat/completions'):
+                    upstreams.count('chat')
+                    return self._chat(payload)
+                self._json({"error": "not found"}, 404)
+
+            #this is fake chat completion: this waits the configured llm latency and then returns (or streams as server-sent events) a fixed-length answer with usage numbers, and this is why we do it like this so time-to-first-token and total generation time are both exercised
+            def _chat(self, payload):
+                prompt_tokens = sum(len(str(m.get('content', ''))) for m in payload.get('messages', [])) // 4
+                tokens = [f"token{i} " for i in range(upstreams.answer_tokens)]
+                usage = {"prompt_tokens": prompt_tokens, "completion_tokens": len(tokens), "total_tokens": prompt_tokens + len(tokens)}
+                base = {"id": "chatcmpl-bench", "created": int(time.time()), "model": payload.get('model')}
+                time.sleep(upstreams.llm_latency)
+
+                if not payload.get('stream'):
+                    return self._json(dict(base, object="chat.completion", usage=usage, choices=[
+                        {"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": "".join(tokens)}}
+                    ]))
+
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/event-stream')
+                self.send_header('Connection', 'close')
+                self.end_headers()
+                chunk = dict(base, object="chat.completion.chunk")
+                for i, token in enumerate(tokens):
+                    delta = {"role": "assistant", "content": token} if i == 0 else {"content": token}
+                    self.wfile.write(f"data: {json.dumps(dict(chunk, choices=[{'index': 0, 'delta': delta, 'finish_reason': None}]))}\n\n".encode())
+                    self.wfile.flush()
+                    time.sleep(upstreams.token_latency)
+                self.wfile.write(f"data: {json.dumps(dict(chunk, choices=[{'index': 0, 'delta': {}, 'finish_reason': 'stop'}]))}\n\n".encode())
+                # edge case: with stream_usage the client expects a final chunk with empty choices that carries the usage
+                if (payload.get('stream_options') or {}).get('include_usage'):
+                    self.wfile.write(f"data: {json.dumps(dict(chunk, choices=[], usage=usage))}\n\n".encode())
+                self.wfile.write(b"data: [DONE]\n\n")
+                self.wfile.flush()
+                self.close_connection = True
+
+        return Handler
@@ -0,0 +1,43 @@
+#this is imports and setup: this imports pandas and numpy to grow the curated policies csv into a synthetic corpus of any size, and this is why we do it like this so graph building, indexing and retrieval can be measured at 1k, 10k and 100k rows long before the real corpus gets there
+import argparse
+import numpy as np
+import pandas as pd
+
+#this is synthetic generation: this samples rows from the real csv and recombines their summaries, years, regions and tags under fresh ids, and this is why we do it like this so the synthetic corpus keeps the real vocabulary, category mix and tag density while every row still renders (and embeds) differently
+def make_policies(source, rows, seed=0):
+    base = pd.read_csv(source)
+    rng = np.random.default_rng(seed)
+    picks = rng.integers(0, len(base), rows)
+    df = base.iloc[picks].reset_index(drop=True)
+
+    df['id'] = [f"{policy_id}-SYN{i:06d}" for i, policy_id in enumerate(df['id'])]
+    df['title'] = [f"{title} ({i})" for i, title in enumerate(df['title'])]
+    df['year'] = rng.integers(1990, 2026, rows)
+    df['effectiveness'] = rng.integers(20, 100, rows)
+
+    # edge case: the second half of each summary comes from another row, so summaries are not just the hundred originals repeated
+    first = base['summary'].str.split('. ', regex=False).str[0].to_numpy()
+    rest = base['summary'].str.split('. ', n=1, regex=False).str[1].fillna('').to_numpy()
+    df['summary'] = [f"{first[a]}. {rest[b]}".strip() for a, b in zip(picks, rng.integers(0, len(base), rows))]
+
+    tag_columns = [c for c in base.columns if set(base[c].dropna().unique()) <= {'Yes', 'No'}]
+    # edge case: tags are resampled at the source csv's own per-tag rate so edge counts scale realistically
+    for tag in tag_columns:
+        rate = float((base[tag] == 'Yes').mean())
+        df[tag] = np.where(rng.random(rows) < rate, 'Yes', 'No')
+    return df
+
+def main():
+    parser = argparse.ArgumentParser(description="write a synthetic policies csv scaled up from data/policies.csv")
+    parser.add_argument('--rows', type=int, default=1000)
+    parser.add_argument('--source', default='data/policies.csv')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--out', default=None, help="defaults to data/policies_<rows>.csv")
+    args = parser.parse_args()
+
+    out = args.out or f"data/policies_{args.rows}.csv"
+    make_policies(args.source, args.rows, args.seed).to_csv(out, index=False)
+    print(f"wrote {args.rows} policies to {out}")
+
+if __name__ == '__main__':
+    main()
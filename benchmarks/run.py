@@ -0,0 +1,261 @@
+#this is imports and setup: this imports the fake upstreams and the synthetic corpus generator and drives the real flask app against them, and this is why we do it like this so every number comes from the same code path production runs, just with the network swapped for localhost
+import io
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import threading
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+
+from benchmarks.fake_upstreams import FakeUpstreams
+from benchmarks.make_policies import make_policies
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULT_PREFIX = "BENCH_RESULT "
+
+QUESTIONS = [
+    "what carbon pricing policies have been most effective",
+    "how do plastic bans compare across countries",
+    "which renewable energy mandates reached their targets",
+    "explain how electric vehicle incentives reduced emissions",
+    "what policies protect biodiversity in forests",
+    "how should a city design a waste management ordinance",
+]
+KEYWORDS = ["carbon tax", "plastic ban", "renewable mandate", "coal phase out", "clean air", "green building"]
+
+#this is the measuring loop: this calls one operation a fixed number of times across a few threads and records each call's latency and the overall wall time, and this is why we do it like this so every row of the report has the same percentile and throughput definitions
+def measure(name, fn, iterations, concurrency=1, setup=None):
+    latencies, errors = [], []
+    lock = threading.Lock()
+
+    def one(i):
+        if setup:
+            setup(i)
+        started = time.perf_counter()
+        try:
+            fn(i)
+        except Exception as e:
+            with lock:
+                errors.append(f"{e.__class__.__name__}: {e}")
+            return
+        elapsed = time.perf_counter() - started
+        with lock:
+            latencies.append(elapsed)
+
+    wall = time.perf_counter()
+    if concurrency <= 1:
+        for i in range(iterations):
+            one(i)
+    else:
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            list(pool.map(one, range(iterations)))
+    wall = time.perf_counter() - wall
+
+    samples = np.asarray(latencies) * 1000
+    result = {"name": name, "n": len(latencies), "errors": len(errors), "throughput": len(latencies) / wall if wall else 0.0}
+    for p in (50, 95, 99):
+        result[f"p{p}"] = float(np.percentile(samples, p)) if len(samples) else None
+    # edge case: only the first error is kept so one broken endpoint doesn't flood the report
+    if errors:
+        result["first_error"] = errors[0]
+    return result
+
+#this is pdf fixture: this writes a minimal multi-page pdf with plain text content streams, and this is why we do it like this so pdf extraction can be measured without shipping binary fixtures or a pdf-writing dependency
+def make_pdf(pages, lines_per_page=40):
+    objects = ["<< /Type /Catalog /Pages 2 0 R >>"]
+    kids = " ".join(f"{3 + 2 * i} 0 R" for i in range(pages))
+    objects.append(f"<< /Type /Pages /Kids [{kids}] /Count {pages} >>")
+    font = 3 + 2 * pages
+    for page in range(pages):
+        lines = [f"({QUESTIONS[(page + n) % len(QUESTIONS)]} section {page + 1} line {n + 1}.) Tj T*" for n in range(lines_per_page)]
+        stream = "BT /F1 10 Tf 12 TL 72 740 Td " + " ".join(lines) + " ET"
+        objects.append(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Contents {4 + 2 * page} 0 R /Resources << /Font << /F1 {font} 0 R >> >> >>")
+        objects.append(f"<< /Length {len(stream)} >>\nstream\n{stream}\nendstream")
+    objects.append("<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+
+    out, offsets = "%PDF-1.4\n", []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += f"{number} 0 obj\n{body}\nendobj\n"
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n" + "".join(f"{o:010d} 00000 n \n" for o in offsets)
+    out += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n"
+    return out.encode('latin-1')
+
+#this is one corpus size: this generates the csv, starts the fake upstreams, points the app at both through env vars, and then times every endpoint and heavy stage, and this is why we do it like this in a fresh process per size because the app starts its data manager and ai engine once per process
+def run_size(args):
+    workdir = tempfile.mkdtemp(prefix='symbiosis-bench-')
+    csv_path = os.path.join(workdir, 'policies.csv')
+    make_policies(os.path.join(ROOT, 'data', 'policies.csv'), args.rows, args.seed).to_csv(csv_path, index=False)
+
+    upstreams = FakeUpstreams(
+        api_latency=args.api_latency / 1000,
+        llm_latency=args.llm_latency / 1000,
+        token_latency=args.token_latency / 1000
+    ).start()
+
+    os.environ.update({
+        "policies_csv": csv_path,
+        "greenpt_api_key": "bench",
+        "greenpt_base_url": f"{upstreams.url}/v1",
+        "embedding_token_check": "0",
+        "worldbank_base_url": f"{upstreams.url}/v2",
+        "openaq_base_url": f"{upstreams.url}/v2",
+        "openaq_api_key": "bench",
+        "vector_cache_dir": os.path.join(workdir, 'vector_index'),
+        "telemetry_cache_path": "",
+        "telemetry_warmup_interval": "0",
+        "policies_watch_interval": "0",
+        "graph_max_neighbors": str(args.max_neighbors),
+    })
+
+    sys.path.insert(0, ROOT)
+    started = time.perf_counter()
+    import app as symbiosis
+    startup = {"startup (import app)": time.perf_counter() - started}
+    # edge case: the csv and the ai engine load on a startup thread, so each phase is timed from the import until it reports ready
+    symbiosis.data_manager.wait_until_loaded()
+    startup["startup (policies ready)"] = time.perf_counter() - started
+    symbiosis.ai_ready.wait()
+    startup["startup (ai ready)"] = time.perf_counter() - started
+
+    from backend.jobs import extract_pdf_text
+    from backend.vector_cache import VectorIndexCache
+    dm, rag, client = symbiosis.data_manager, symbiosis.rag_engine, symbiosis.app.test_client()
+    countries = sorted(dm.iso_map)
+    n, c, heavy = args.iterations, args.concurrency, args.heavy_iterations
+    results = [{"name": name, "n": 1, "errors": 0, "throughput": 0.0, "p50": seconds * 1000, "p95": seconds * 1000, "p99": seconds * 1000} for name, seconds in startup.items()]
+
+    def get(url):
+        response = client.get(url)
+        if response.status_code >= 400:
+            raise RuntimeError(f"{url} returned {response.status_code}")
+        return response
+
+    def post(url, **kwargs):
+        response = client.post(url, **kwargs)
+        if response.status_code >= 400:
+            raise RuntimeError(f"{url} returned {response.status_code}")
+        return response
+
+    def upload(i):
+        response = post('/api/upload_policy', data={"file": (io.BytesIO(pdf), 'draft.pdf')}, content_type='multipart/form-data')
+        job_id = response.get_json()["job_id"]
+        while True:
+            job = get(f"/api/jobs/{job_id}").get_json()
+            if job["status"] in ('done', 'error'):
+                if job["status"] == 'error':
+                    raise RuntimeError(job["error"])
+                return
+            time.sleep(0.01)
+
+    pdf = make_pdf(args.pdf_pages)
+    categories = dm.store.values('category')
+
+    # edge case: each cold row clears exactly the cache it is measuring, so warm and cold numbers are directly comparable
+    suite = [
+        ("GET /api/graph (cached)", lambda i: get('/api/graph'), n, c, None),
+        ("GET /api/graph (cold, filtered)", lambda i: get(f"/api/graph?category={categories[i % len(categories)]}"), n, 1, lambda i: dm.graph_cache.clear()),
+        ("GET /api/graph (cold, search)", lambda i: get(f"/api/graph?search={KEYWORDS[i % len(KEYWORDS)].split()[0]}"), n, 1, lambda i: dm.graph_cache.clear()),
+        ("GET /api/suggest", lambda i: get(f"/api/suggest?q={KEYWORDS[i % len(KEYWORDS)][:3]}"), n, c, None),
+        ("GET /api/filters", lambda i: get('/api/filters'), n, c, None),
+        ("GET /api/countries", lambda i: get('/api/countries'), n, c, None),
+        ("GET /api/telemetry (cold)", lambda i: get(f"/api/telemetry?country={countries[i % len(countries)]}"), n, 1, lambda i: dm.telemetry_cache.clear()),
+        ("GET /api/telemetry (warm)", lambda i: get(f"/api/telemetry?country={countries[i % len(countries)]}"), n, c, None),
+        ("POST /api/telemetry (bulk, cold)", lambda i: post('/api/telemetry', json={"countries": countries}), heavy, 1, lambda i: dm.telemetry_cache.clear()),
+        ("POST /api/ask (semantic)", lambda i: post('/api/ask', json={"query": f"{QUESTIONS[i % len(QUESTIONS)]} case {i}"}), n, c, None),
+        ("POST /api/ask (keyword)", lambda i: post('/api/ask', json={"query": f"{KEYWORDS[i % len(KEYWORDS)]} {i}"}), n, c, None),
+        ("POST /api/ask (stream)", lambda i: post('/api/ask', json={"query": f"{QUESTIONS[i % len(QUESTIONS)]} streamed {i}", "stream": True}).get_data(), n, c, None),
+        ("POST /api/ask (answer cache)", lambda i: post('/api/ask', json={"query": QUESTIONS[0]}), n, c, None),
+        ("POST /api/generate_report", lambda i: post('/api/generate_report', json={"country": countries[i % len(countries)]}), heavy, 1, lambda i: rag.answer_cache.invalidate()),
+        ("upload + analyze pdf (job)", upload, heavy, 1, None),
+        ("stage: csv load", lambda i: dm._read_store(), heavy, 1, None),
+        ("stage: search index build", lambda i: dm._build_search_index(dm.store), heavy, 1, None),
+        ("stage: graph nodes build", lambda i: dm._build_graph_nodes(dm.store), heavy, 1, None),
+        ("stage: graph build (unfiltered)", lambda i: dm.get_graph_data('', '', ''), heavy, 1, None),
+        ("stage: vector index build (warm)", lambda i: rag._build_vector_store(dm.store), heavy, 1, None),
+        ("stage: vector index build (cold)", lambda i: rag._build_vector_store(dm.store), heavy, 1,
+            lambda i: setattr(rag, 'vector_cache', VectorIndexCache(os.path.join(workdir, f'cold_{i}'), rag.embeddings.model))),
+        (f"stage: pdf extraction ({args.pdf_pages} pages)", lambda i: extract_pdf_text(pdf, 10 ** 6, 10 ** 6), heavy, 1, None),
+    ]
+
+    # edge case: warm rows that cycle through many keys need all of them cached up front, not just the one a single warm-up call touches
+    primes = {"GET /api/telemetry (warm)": lambda: dm.prefetch_telemetry(countries)}
+
+    only = [s.lower() for s in args.only]
+    for name, fn, iterations, concurrency, setup in suite:
+        if only and not any(s in name.lower() for s in only):
+            continue
+        print(f"running {name}...", file=sys.stderr, flush=True)
+        # edge case: one warm-up call so lazy pools and first-request imports don't land in the percentiles
+        if setup is None:
+            try:
+                primes.get(name, lambda: fn(-1))()
+            except Exception:
+                pass
+        results.append(measure(name, fn, iterations, concurrency, setup))
+
+    upstreams.stop()
+    return {"rows": args.rows, "results": results, "upstream_requests": upstreams.requests}
+
+def print_report(report):
+    print(f"\n== {report['rows']} policies ==")
+    print(f"{'benchmark':<40} {'n':>5} {'err':>4} {'p50 ms':>10} {'p95 ms':>10} {'p99 ms':>10} {'ops/s':>9}")
+    fmt = lambda v: f"{v:10.1f}" if v is not None else f"{'-':>10}"
+    for r in report["results"]:
+        print(f"{r['name']:<40} {r['n']:>5} {r['errors']:>4} {fmt(r['p50'])} {fmt(r['p95'])} {fmt(r['p99'])} {r['throughput']:9.1f}")
+        if r.get("first_error"):
+            print(f"    first error: {r['first_error']}")
+    print("upstream requests: " + ", ".join(f"{k}={v}" for k, v in sorted(report["upstream_requests"].items())))
+
+#this is the driver: this runs each corpus size in its own python process and collects the json each child prints, and this is why we do it like this so sizes never share a warmed cache or a half-built ai engine
+def main():
+    parser = argparse.ArgumentParser(description="offline benchmarks for symbiosis against local fake upstreams")
+    parser.add_argument('--rows', type=int, nargs='+', default=[1000, 10000])
+    parser.add_argument('--iterations', type=int, default=50, help="calls per endpoint benchmark")
+    parser.add_argument('--heavy-iterations', type=int, default=3, help="calls per heavy stage (builds, bulk telemetry, uploads)")
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--api-latency', type=float, default=50, help="fake world bank, openaq and embedding latency (ms)")
+    parser.add_argument('--llm-latency', type=float, default=200, help="fake chat completion latency before the first token (ms)")
+    parser.add_argument('--token-latency', type=float, default=5, help="fake delay between streamed tokens (ms)")
+    parser.add_argument('--pdf-pages', type=int, default=20)
+    # edge case: uncapped unfiltered graphs grow quadratically and run out of memory past a few thousand policies, so the benchmark caps neighbors by default
+    parser.add_argument('--max-neighbors', type=int, default=20, help="graph_max_neighbors for the run (0 is uncapped)")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--only', nargs='*', default=[], help="run only benchmarks whose name contains one of these strings")
+    parser.add_argument('--json', help="also write the raw results to this file")
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        args.rows = args.rows[0]
+        print(RESULT_PREFIX + json.dumps(run_size(args)), flush=True)
+        # edge case: daemon threads (warm-up, upload pools) would otherwise keep the child alive
+        os._exit(0)
+
+    reports = []
+    for rows in args.rows:
+        command = [sys.executable, '-m', 'benchmarks.run', '--child', '--rows', str(rows)]
+        for flag in ('iterations', 'heavy_iterations', 'concurrency', 'api_latency', 'llm_latency', 'token_latency', 'pdf_pages', 'max_neighbors', 'seed'):
+            command += [f"--{flag.replace('_', '-')}", str(getattr(args, flag))]
+        if args.only:
+            command += ['--only'] + args.only
+        child = subprocess.run(command, cwd=ROOT, capture_output=True, text=True)
+        lines = [l for l in child.stdout.splitlines() if l.startswith(RESULT_PREFIX)]
+        if child.returncode != 0 or not lines:
+            print(f"benchmark for {rows} policies failed:\n{child.stderr[-2000:]}")
+            continue
+        report = json.loads(lines[-1][len(RESULT_PREFIX):])
+        print_report(report)
+        reports.append(report)
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(reports, f, indent=2)
+
+if __name__ == '__main__':
+    main()
@@ -39,23 +39,40 @@ document.addEventListener('DOMContentLoaded', function() {
         chatHistory.appendChild(loadingDiv);
         scrollToBottom();
         
+        var answerDiv = null;
+        var answer = '';
+
         fetch('/api/ask', {
             method: 'POST',
             headers: { 'Content-Type': 'application/json' },
-            body: JSON.stringify({ query: query })
+            body: JSON.stringify({ query: query, stream: true })
         })
-        .then(res => res.json())
-        .then(data => {
+        .then(res => window.readNdjson(res, data => {
             // edge case: ensure loader actually exists before trying to delete it
             var loader = document.getElementById(loadingId);
-            if(loader) loader.remove();
             
             if (data.error) {
+                if(loader) loader.remove();
                 appendMessage("error: " + data.error, 'ai');
-            } else {
-                var formattedAnswer = marked.parse(String(data.answer));
-                appendMessage(formattedAnswer, 'ai');
+            } else if (data.token !== undefined) {
+                // edge case: swap the loader for a live bubble on the first token, then re-render the growing markdown in place
+                if(loader) loader.remove();
+                if (!answerDiv) {
+                    appendMessage('', 'ai');
+                    answerDiv = chatHistory.lastElementChild;
+                }
+                answer += data.token;
+                answerDiv.innerHTML = marked.parse(answer);
+                scrollToBottom();
+            } else if (data.answer !== undefined) {
+                // edge case: the offline fallback still comes back as a plain json answer instead of a stream
+                if(loader) loader.remove();
+                appendMessage(marked.parse(String(data.answer)), 'ai');
             }
+        }))
+        .then(() => {
+            var loader = document.getElementById(loadingId);
+            if(loader) loader.remove();
         })
         .catch(err => {
             var loader = document.getElementById(loadingId);
@@ -88,22 +105,35 @@ document.addEventListener('DOMContentLoaded', function() {
             chatHistory.appendChild(loadingDiv);
             scrollToBottom();
 
+            var reportDiv = null;
+            var reportMd = '';
+
             fetch('/api/generate_report', {
                 method: 'POST',
                 headers: { 'Content-Type': 'application/json' },
-                body: JSON.stringify({ country: country })
+                body: JSON.stringify({ country: country, stream: true })
             })
-            .then(res => res.json())
-            .then(data => {
+            .then(res => window.readNdjson(res, data => {
                 var loader = document.getElementById(loadingId);
-                if(loader) loader.remove();
 
                 if(data.error) {
+                    if(loader) loader.remove();
                     appendMessage("error generating report: " + data.error, 'ai');
-                } else {
-                    var reportHtml = `<div class="formal-report">` + marked.parse(data.report_md) + `</div>`;
-                    appendMessage(reportHtml, 'ai');
+                } else if (data.token !== undefined) {
+                    if(loader) loader.remove();
+                    // edge case: create the formal report wrapper once and keep filling it so the styling stays distinct while streaming
+                    if (!reportDiv) {
+                        appendMessage(`<div class="formal-report"></div>`, 'ai');
+                        reportDiv = chatHistory.lastElementChild.querySelector('.formal-report');
+                    }
+                    reportMd += data.token;
+                    reportDiv.innerHTML = marked.parse(reportMd);
+                    scrollToBottom();
                 }
+            }))
+            .then(() => {
+                var loader = document.getElementById(loadingId);
+                if(loader) loader.remove();
             })
             .catch(err => {
                 var loader = document.getElementById(loadingId);
@@ -180,6 +180,26 @@ function applyFilters() {
     drawGraph(search, category, type);
 }
 
+//this is type-ahead logic: this asks the backend search index for words starting with the last typed term and fills the datalist under the search box, and this is why we do it like this so suggestions come from the same index that filters the graph
+function updateSuggestions(text) {
+    var list = document.getElementById('searchSuggestions');
+    // edge case: skip the round trip when the datalist is missing or nothing has been typed yet
+    if (!list || !text.trim()) return;
+
+    fetch(`/api/suggest?q=${encodeURIComponent(text)}`)
+        .then(res => res.json())
+        .then(words => {
+            var head = text.replace(/\S*$/, '');
+            list.innerHTML = '';
+            words.forEach(w => {
+                var opt = document.createElement('option');
+                opt.value = head + w;
+                list.appendChild(opt);
+            });
+        })
+        .catch(err => console.error("suggest fetch error:", err));
+}
+
 //this is ui initialization: this populates the dropdowns and binds event listeners when the dom loads, and this is why we do it like this to prepare the environment before drawing the initial graph
 document.addEventListener('DOMContentLoaded', function() {
     fetch('/api/filters')
@@ -213,6 +233,7 @@ document.addEventListener('DOMContentLoaded', function() {
     var slider = document.getElementById('spacingSlider');
 
     if(searchInput) searchInput.addEventListener('input', applyFilters);
+    if(searchInput) searchInput.addEventListener('input', function() { updateSuggestions(this.value); });
     if(catSelect) catSelect.addEventListener('change', applyFilters);
     if(typeSelect) typeSelect.addEventListener('change', applyFilters);
     
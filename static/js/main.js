@@ -25,6 +25,30 @@ function switchTab(tabId) {
     document.getElementById('view-' + tabId).classList.add('active');
 }
 
+//this is stream reading logic: this reads a newline-delimited json response chunk by chunk and hands each parsed event to a callback, and this is why we do it like this so chat, reports and the analyzer can render llm tokens the moment they arrive
+window.readNdjson = function(response, onEvent) {
+    // edge case: non-streaming error responses (e.g. a 400 with a json body) are passed through as a single event
+    if (!response.body || !(response.headers.get('Content-Type') || '').includes('ndjson')) {
+        return response.json().then(data => { onEvent(data); });
+    }
+
+    var reader = response.body.getReader();
+    var decoder = new TextDecoder();
+    var buffer = '';
+
+    function pump() {
+        return reader.read().then(({ done, value }) => {
+            buffer += decoder.decode(value || new Uint8Array(), { stream: !done });
+            var lines = buffer.split('\n');
+            // edge case: keep the trailing partial line in the buffer until the rest of it arrives
+            buffer = done ? '' : lines.pop();
+            lines.forEach(line => { if (line.trim()) onEvent(JSON.parse(line)); });
+            if (!done) return pump();
+        });
+    }
+    return pump();
+};
+
 //this is help modal logic: this binds click events to toggle the hidden state of the popup guide overlay, and this is why we do it like this to provide immediate context to new users without taking them away from their current data view
 window.addEventListener('DOMContentLoaded', function() {
     const helpBtn = document.getElementById('helpBtn');
@@ -110,45 +134,65 @@ window.addEventListener('DOMContentLoaded', function() {
             if (uploadBox) uploadBox.style.opacity = '0.5';
 
             console.log("sending file to python backend..."); 
+            formData.append('stream', '1');
 
-            fetch('/api/upload_policy', {
-                method: 'POST',
-                body: formData
-            })
-            .then(res => res.json())
-            .then(data => {
-                // edge case: debug logging to verify server response payload
-                console.log("server responded!", data); 
-                
-                // edge case: reset ui state regardless of success or failure
+            var answer = '';
+            var failed = false;
+
+            // edge case: reset ui state regardless of success or failure
+            function resetUi() {
                 if (loadingDiv) loadingDiv.classList.add('hidden');
                 submitBtn.disabled = false;
                 submitBtn.textContent = "Analyze Document";
                 if (clearBtn) clearBtn.disabled = false;
                 if (uploadBox) uploadBox.style.opacity = '1';
+            }
+
+            function showResult(html) {
+                if (resultsDiv) {
+                    resultsDiv.innerHTML = html;
+                    resultsDiv.classList.remove('hidden');
+                }
+            }
 
-                if(data.error) {
-                    if (resultsDiv) resultsDiv.innerHTML = "<h3 style='color: var(--error);'>error</h3><p>" + data.error + "</p>";
-                } else {
+            function handleEvent(data) {
+                if (data.error) {
+                    failed = true;
+                    resetUi();
+                    showResult("<h3 style='color: var(--error);'>error</h3><p>" + data.error + "</p>");
+                } else if (data.token !== undefined && !failed) {
+                    // edge case: hide the spinner on the first token and re-render the growing markdown so headers appear as they're written
+                    if (!answer) resetUi();
+                    answer += data.token;
+                    showResult(marked.parse(answer));
+                } else if (data.answer !== undefined) {
                     // edge case: pass the raw ai string into the marked.js parser to render headers and bold text properly
-                    if (resultsDiv) resultsDiv.innerHTML = marked.parse(String(data.answer));
+                    showResult(marked.parse(String(data.answer)));
                 }
-                if (resultsDiv) resultsDiv.classList.remove('hidden');
+            }
+
+            fetch('/api/upload_policy', {
+                method: 'POST',
+                body: formData
+            })
+            .then(res => res.json())
+            .then(job => {
+                // edge case: validation errors come back immediately instead of a job, so they skip the stream entirely
+                if (job.error || !job.stream_url) return handleEvent(job);
+                console.log("upload accepted as job:", job.job_id);
+                return fetch(job.stream_url).then(res => window.readNdjson(res, handleEvent));
+            })
+            .then(() => {
+                // edge case: debug logging to verify the stream finished
+                console.log("server responded!"); 
+                resetUi();
             })
             .catch(err => {
                 // edge case: debug logging for fetch failures
                 console.error("fetch error:", err); 
                 
-                if (loadingDiv) loadingDiv.classList.add('hidden');
-                submitBtn.disabled = false;
-                submitBtn.textContent = "Analyze Document";
-                if (clearBtn) clearBtn.disabled = false;
-                if (uploadBox) uploadBox.style.opacity = '1';
-                
-                if (resultsDiv) {
-                    resultsDiv.innerHTML = "<h3 style='color: var(--error);'>connection error</h3><p>failed to analyze document. check server logs.</p>";
-                    resultsDiv.classList.remove('hidden');
-                }
+                resetUi();
+                showResult("<h3 style='color: var(--error);'>connection error</h3><p>failed to analyze document. check server logs.</p>");
             });
         });
     }
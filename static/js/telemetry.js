@@ -22,7 +22,7 @@ window.populateCountries = function() {
     }
 };
 
-//this is dashboard updating: this grabs specific metrics for one or two countries using promise.all to fetch them simultaneously, and it bundles them into arrays for chart.js, and this is why we do it like this so the ui waits for all data before drawing
+//this is dashboard updating: this grabs specific metrics for one or two countries in a single batch request, and it bundles them into arrays for chart.js, and this is why we do it like this so the ui waits for all data before drawing and the server can fetch both countries in bulk
 window.loadDashboard = function() {
     const country1 = document.getElementById('countrySelect').value;
     const country2 = document.getElementById('countrySelect2').value;
@@ -30,17 +30,20 @@ window.loadDashboard = function() {
     // edge case: abort immediately if the primary country isn't selected yet
     if (!country1) return;
 
-    let fetches = [fetch(`/api/telemetry?country=${encodeURIComponent(country1)}`).then(res => res.json())];
-    
-    // edge case: conditionally add the second fetch call only if the user picked a comparison country
-    if (country2) {
-        fetches.push(fetch(`/api/telemetry?country=${encodeURIComponent(country2)}`).then(res => res.json()));
-    }
+    // edge case: conditionally add the second country only if the user picked a comparison country
+    let countries = [country1];
+    if (country2) countries.push(country2);
 
-    Promise.all(fetches)
+    fetch('/api/telemetry', {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ countries: countries })
+    })
+        .then(res => res.json())
         .then(results => {
-            const data1 = results[0];
-            const data2 = results.length > 1 ? results[1] : null;
+            const data1 = results[country1];
+            // edge case: comparing a country with itself comes back as a single entry
+            const data2 = country2 ? results[country2] : null;
 
             let co2Datasets = [{ label: country1, data: data1.metrics.co2, color: '#ea580c' }];
             let renewDatasets = [{ label: country1, data: data1.metrics.renewables, color: '#0d9488' }];